@@ -1,15 +1,96 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
 
-from .models import Comment, News
+from yacommon.cache import get_fragment_cache
 
+from .cache import comment_fragment_key, invalidate_news_pages
+from .models import Comment, News
 
-class CommentInline(admin.StackedInline):
-    model = Comment
-    extra = 0
+HIDDEN_COMMENT_TEXT = 'Комментарий скрыт модератором.'
 
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
-    inlines = [
-        CommentInline,
-    ]
+    """
+    Новости без встроенных форм комментариев.
+
+    Комментарии популярной новости открываются по ссылке
+    в постраничном списке CommentAdmin.
+    """
+    list_display = ('title', 'date', 'comment_count')
+    readonly_fields = ('comments_link',)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_comment_count()
+
+    @admin.display(description='Комментариев')
+    def comment_count(self, obj):
+        return obj.comment_count
+
+    @admin.display(description='Комментарии')
+    def comments_link(self, obj):
+        if obj.pk is None:
+            return '-'
+        url = reverse('admin:news_comment_changelist')
+        return format_html(
+            '<a href="{}?news__id__exact={}">Открыть список ({})</a>',
+            url, obj.pk, obj.comment_count
+        )
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    """
+    Постраничный список комментариев для модерации.
+
+    Фильтры идут по индексированным полям, а массовые действия
+    выполняются одним запросом UPDATE или DELETE.
+    """
+    list_display = ('__str__', 'news', 'author', 'created')
+    list_select_related = ('news', 'author')
+    list_filter = ('created',)
+    search_fields = ('=author__username',)
+    raw_id_fields = ('news', 'author')
+    show_full_result_count = False
+    actions = ('hide_comments', 'delete_comments')
+
+    def get_actions(self, request):
+        # Стандартное удаление сначала выводит страницу подтверждения
+        # со всеми выбранными комментариями.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(
+        description='Скрыть текст выбранных комментариев',
+        permissions=('change',),
+    )
+    def hide_comments(self, request, queryset):
+        news_ids = set(queryset.values_list('news_id', flat=True).distinct())
+        count = queryset.update(
+            text=HIDDEN_COMMENT_TEXT, updated=timezone.now()
+        )
+        invalidate_news_pages(*news_ids)
+        self.message_user(request, f'Скрыто комментариев: {count}.')
+
+    @admin.action(
+        description='Удалить выбранные комментарии',
+        permissions=('delete',),
+    )
+    def delete_comments(self, request, queryset):
+        # queryset.delete() из-за приёмников post_delete загружает
+        # каждый комментарий и удаляет их пачками по 100. Каскадов
+        # у комментария нет, так что хватает одного DELETE, а кеш
+        # сбрасывается здесь же, как в hide_comments.
+        rows = list(queryset.values_list('pk', 'updated', 'news_id'))
+        count = queryset._raw_delete(queryset.db)
+        invalidate_news_pages(*{news_id for _, _, news_id in rows})
+        get_fragment_cache().delete_many(
+            [comment_fragment_key(pk, updated) for pk, updated, _ in rows]
+        )
+        self.message_user(
+            request, f'Удалено комментариев: {count}.', messages.SUCCESS
+        )
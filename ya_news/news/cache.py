@@ -0,0 +1,168 @@
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response,
+                                patch_vary_headers)
+
+from yacommon.cache import get_fragment_cache
+from yacommon.metrics import registry
+
+PAGE_KEY_PREFIX: str = 'news:page'
+CACHE_STATUS_HEADER: str = 'X-Page-Cache'
+# Имена фрагментов в тегах {% cache %} шаблонов.
+NEWS_CARD_FRAGMENT: str = 'news_card'
+COMMENT_FRAGMENT: str = 'comment'
+
+
+class PageCacheStats:
+    """Счётчики попаданий и промахов кеша страниц в этом процессе."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def collect(self):
+        """Счётчики для yacommon.metrics."""
+        with self._lock:
+            return (
+                ('news_page_cache_hits_total', 'counter',
+                 'Страницы, отданные из кеша.', self.hits),
+                ('news_page_cache_misses_total', 'counter',
+                 'Страницы, собранные заново.', self.misses),
+            )
+
+
+stats = PageCacheStats()
+registry.add_collector(stats.collect)
+
+
+def get_page_cache():
+    return caches[settings.NEWS_PAGE_CACHE_ALIAS]
+
+
+def news_card_key(news_id):
+    return make_template_fragment_key(NEWS_CARD_FRAGMENT, (news_id,))
+
+
+def comment_fragment_key(comment_id, updated):
+    return make_template_fragment_key(COMMENT_FRAGMENT, (comment_id, updated))
+
+
+def home_page_key():
+    return f'{PAGE_KEY_PREFIX}:home'
+
+
+def detail_page_key(news_id):
+    return f'{PAGE_KEY_PREFIX}:detail:{news_id}'
+
+
+def generation_key(page_key):
+    return f'{page_key}:generation'
+
+
+def invalidate_pages(page_keys):
+    """
+    Сбрасывает закешированные страницы.
+
+    Вместе со страницей меняется её поколение: ответ, который
+    рендерился во время сброса, уже не попадёт в кеш как актуальный.
+    """
+    cache = get_page_cache()
+    cache.set_many(
+        {generation_key(key): uuid.uuid4().hex for key in page_keys},
+        timeout=None,
+    )
+    cache.delete_many(page_keys)
+
+
+def invalidate_news_pages(*news_ids):
+    """
+    Сбрасывает главную страницу, страницы перечисленных новостей
+    и их карточки в кеше фрагментов.
+    """
+    invalidate_pages(
+        [home_page_key()] + [detail_page_key(pk) for pk in news_ids]
+    )
+    if news_ids:
+        get_fragment_cache().delete_many(
+            [news_card_key(pk) for pk in news_ids]
+        )
+
+
+class AnonymousPageCacheMixin:
+    """
+    Отдаёт анонимным читателям готовую страницу из кеша.
+
+    Записи удаляются сигналами об изменении новостей и комментариев
+    (см. news.signals) и живут не дольше NEWS_CACHE_TIMEOUT. Вместе
+    со страницей хранится её ETag, так что условные запросы тоже
+    обходятся без БД.
+    """
+
+    def get_page_cache_key(self):
+        """Ключ страницы; тот же ключ должны сбрасывать сигналы."""
+        raise ImproperlyConfigured(
+            f'{type(self).__name__} должен определить get_page_cache_key(): '
+            'страницу с неизвестным ключом сигналы не сбросят.'
+        )
+
+    def is_page_cacheable(self, request):
+        return (
+            settings.NEWS_PAGE_CACHE_ENABLED
+            and request.method in ('GET', 'HEAD')
+            and not request.GET
+            and not request.user.is_authenticated
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        cache = get_page_cache()
+        key = self.get_page_cache_key()
+        cached = cache.get_many((key, generation_key(key)))
+        generation = cached.get(generation_key(key))
+        entry = cached.get(key)
+        if entry is not None and entry['generation'] == generation:
+            stats.hit()
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type']
+            )
+            response[CACHE_STATUS_HEADER] = 'hit'
+            patch_vary_headers(response, ('Cookie',))
+            if entry['etag']:
+                response['ETag'] = entry['etag']
+            return get_conditional_response(
+                request, etag=entry['etag'], response=response
+            )
+        stats.miss()
+        response = super().dispatch(request, *args, **kwargs)
+        response[CACHE_STATUS_HEADER] = 'miss'
+
+        def store(response):
+            if response.status_code == 200:
+                cache.set(key, {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'etag': response.get('ETag'),
+                    'generation': generation,
+                }, timeout=settings.NEWS_CACHE_TIMEOUT)
+
+        if getattr(response, 'is_rendered', True):
+            store(response)
+        else:
+            response.add_post_render_callback(store)
+        return response
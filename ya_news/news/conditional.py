@@ -0,0 +1,60 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.middleware.csrf import get_token
+
+from .models import Comment, News
+
+
+def make_etag(request, state):
+    """
+    Собирает ETag из состояния моделей, пользователя и адреса страницы.
+
+    Пользователь входит в ETag, потому что авторизованным читателям
+    страницы показываются иначе, чем анонимным. Им же страница выводит
+    форму с CSRF-токеном: токен меняется при входе, и ответ 304 оставил
+    бы в браузере старый, так что следующий POST получил бы 403.
+    Анонимная страница одна на всех и хранится в кеше вместе с ETag,
+    поэтому в её ETag токена нет.
+    """
+    csrf_token = None
+    if request.user.is_authenticated:
+        # get_token() каждый раз маскирует токен заново, поэтому в ETag
+        # идёт значение cookie; вызов выставит cookie, если её ещё нет.
+        get_token(request)
+        csrf_token = request.META['CSRF_COOKIE']
+    return hashlib.md5(repr((
+        request.user.pk, csrf_token, request.get_full_path(), state
+    )).encode()).hexdigest()
+
+
+def news_list_etag(request):
+    """Версия главной: выведенные новости и число комментариев к ним."""
+    return make_etag(request, list(
+        News.objects.with_comment_count().values_list(
+            'pk', 'updated', 'comment_count'
+        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+    ))
+
+
+def news_detail_etag(request, pk):
+    """
+    Версия страницы новости: сама новость и сводка по её комментариям.
+
+    Число комментариев ловит удаления, время последней правки — изменения.
+    """
+    comments = Comment.objects.filter(
+        news=OuterRef('pk')
+    ).order_by().values('news')
+    state = News.objects.filter(pk=pk).annotate(
+        comment_count=Subquery(
+            comments.annotate(count=Count('pk')).values('count')
+        ),
+        last_comment_update=Subquery(
+            comments.annotate(last=Max('updated')).values('last')
+        ),
+    ).values_list('updated', 'comment_count', 'last_comment_update').first()
+    if state is None:
+        return None
+    return make_etag(request, state)
@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def cache_timeout(request):
+    """Срок карточек новостей для тега {% cache %}."""
+    return {'news_cache_timeout': settings.NEWS_CACHE_TIMEOUT}
@@ -0,0 +1,62 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from news.moderation import BadWordsMatcher
+
+ALPHABET: str = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+
+
+def loop_search(words, text):
+    """Прежняя проверка: поиск каждого слова по всему тексту."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость фильтра запрещённых слов на автомате '
+        'Ахо — Корасик с прежним перебором слов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=5000)
+        parser.add_argument('--text-length', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = tuple(
+            ''.join(rng.choices(ALPHABET, k=rng.randint(6, 12)))
+            for _ in range(options['words'])
+        )
+        # Пробелы через каждые несколько букв: чистый текст без совпадений
+        # заставляет оба способа просмотреть его целиком.
+        text = ' '.join(
+            ''.join(rng.choices(ALPHABET, k=rng.randint(2, 5)))
+            for _ in range(options['text_length'] // 4)
+        )[:options['text_length']]
+        build_time = timeit.timeit(lambda: BadWordsMatcher(words), number=1)
+        matcher = BadWordsMatcher(words)
+        repeat = options['repeat']
+        results = (
+            ('loop', timeit.timeit(
+                lambda: loop_search(words, text), number=repeat
+            )),
+            ('automaton', timeit.timeit(
+                lambda: matcher.search(text), number=repeat
+            )),
+        )
+        self.stdout.write(
+            f'{len(words)} words, {len(text)} chars, '
+            f'automaton built in {build_time * 1000:.1f} ms'
+        )
+        for name, total in results:
+            self.stdout.write(
+                f'{name:>10}: {total / repeat * 1000:.3f} ms per comment'
+            )
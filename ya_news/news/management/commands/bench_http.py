@@ -0,0 +1,57 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+
+from news.models import News
+from yacommon.benchmark import BenchmarkCommand, RequestSpec, login_cookies
+
+COMMENT_TEXT: str = 'Комментарий из нагрузочного замера'
+# Параметры seed_news для каждого масштаба данных.
+SCALES = {
+    'small': {'users': 100, 'news': 200, 'comments': 2_000},
+    'medium': {'users': 2_000, 'news': 10_000, 'comments': 200_000},
+    'large': {'users': 10_000, 'news': 100_000, 'comments': 1_000_000},
+}
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Замеряет задержки, запросы в секунду и память на маршрутах '
+        'новостей через yanews.wsgi.application во временной базе, '
+        'заполненной seed_news.'
+    )
+    application = 'yanews.wsgi.application'
+    scales = SCALES
+    routes = ('home', 'detail', 'comment')
+
+    def prepare(self, scale, seed):
+        call_command('seed_news', seed=seed, **SCALES[scale])
+        self.news_ids = list(News.objects.values_list('pk', flat=True))
+        self.cookies, self.csrf_token = login_cookies(
+            User.objects.get(username=f'seed{seed}_0')
+        )
+
+    def route_home(self, count):
+        return [RequestSpec('GET', reverse('news:home'))] * count
+
+    def route_detail(self, count):
+        return [
+            RequestSpec('GET', reverse('news:detail', args=(pk,)))
+            for pk in self.rng.choices(self.news_ids, k=count)
+        ]
+
+    def route_comment(self, count):
+        return [
+            RequestSpec(
+                'POST',
+                reverse('news:detail', args=(pk,)),
+                {'text': COMMENT_TEXT, 'csrfmiddlewaretoken': self.csrf_token},
+                self.cookies,
+                HTTPStatus.FOUND,
+            )
+            for pk in self.rng.choices(self.news_ids, k=count)
+        ]
@@ -0,0 +1,96 @@
+import random
+import sqlite3
+import tempfile
+import time
+from functools import partial
+from itertools import accumulate
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from news.search import TEXT_WEIGHT, TITLE_WEIGHT, build_match_query
+
+ALPHABET: str = 'абвгдежзийклмнопрстуфхцчшщыьэюя'
+
+SCHEMA = (
+    'CREATE TABLE news ('
+    'id INTEGER PRIMARY KEY, title TEXT, text TEXT, date TEXT)',
+    "CREATE VIRTUAL TABLE news_fts USING fts5(title, text, content='news', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+)
+LIKE_QUERY = (
+    'SELECT id FROM news WHERE title LIKE ? OR text LIKE ? '
+    'ORDER BY date DESC LIMIT 10'
+)
+FTS_QUERY = (
+    'SELECT rowid FROM news_fts WHERE news_fts MATCH ? '
+    'ORDER BY bm25(news_fts, ?, ?) LIMIT 10'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по индексу FTS5 с перебором LIKE '
+        'на временной базе SQLite с заданным числом новостей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = [
+            ''.join(rng.choices(ALPHABET, k=rng.randint(4, 10)))
+            for _ in range(20000)
+        ]
+        # Частоты слов по закону Ципфа, как в живом тексте.
+        pick = partial(rng.choices, vocabulary, cum_weights=list(
+            accumulate(1 / rank for rank in range(1, len(vocabulary) + 1))
+        ))
+        with tempfile.TemporaryDirectory() as directory:
+            db = sqlite3.connect(Path(directory) / 'bench.sqlite3')
+            for statement in SCHEMA:
+                db.execute(statement)
+            started = time.perf_counter()
+            db.executemany(
+                'INSERT INTO news (title, text, date) VALUES (?, ?, ?)',
+                (
+                    (
+                        ' '.join(pick(k=5)),
+                        ' '.join(pick(k=40)),
+                        f'20{index % 24:02}-01-01',
+                    )
+                    for index in range(options['rows'])
+                )
+            )
+            db.execute("INSERT INTO news_fts(news_fts) VALUES ('rebuild')")
+            db.commit()
+            self.stdout.write(
+                f'{options["rows"]} news loaded and indexed in '
+                f'{time.perf_counter() - started:.1f} s'
+            )
+            # Редкие слова: здесь индекс выигрывает сильнее всего,
+            # а LIKE всё равно читает всю таблицу.
+            words = rng.sample(vocabulary[1000:], options['queries'])
+            like_time = self.measure(db, LIKE_QUERY, (
+                (f'%{word}%', f'%{word}%') for word in words
+            ))
+            fts_time = self.measure(db, FTS_QUERY, (
+                (build_match_query(word), TITLE_WEIGHT, TEXT_WEIGHT)
+                for word in words
+            ))
+            db.close()
+        for name, total in (('LIKE', like_time), ('FTS5', fts_time)):
+            self.stdout.write(
+                f'{name:>5}: {total / options["queries"] * 1000:.2f} ms '
+                f'per query'
+            )
+
+    @staticmethod
+    def measure(db, query, params):
+        started = time.perf_counter()
+        for args in params:
+            db.execute(query, args).fetchall()
+        return time.perf_counter() - started
@@ -0,0 +1,128 @@
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yacommon.sqlite3.base import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE news (id INTEGER PRIMARY KEY, title TEXT)',
+    'CREATE TABLE comment ('
+    'id INTEGER PRIMARY KEY, news_id INTEGER, text TEXT, created REAL)',
+    'CREATE INDEX comment_news_created ON comment (news_id, created, id)',
+)
+NEWS_COUNT: int = 100
+# Запись комментария так, как её делает NewsComment: проверка
+# новости и вставка, каждая в режиме autocommit.
+WRITE = (
+    'SELECT id FROM news WHERE id = ?',
+    'INSERT INTO comment (news_id, text, created) VALUES (?, ?, ?)',
+)
+READ = (
+    'SELECT id, text FROM comment WHERE news_id = ? '
+    'ORDER BY created, id LIMIT 20'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентную запись комментариев в SQLite '
+        'с настройками по умолчанию и с SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=3.0)
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('default', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        for name, pragmas in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / 'bench.sqlite3'
+                self.prepare(path, pragmas)
+                result = self.run(path, pragmas, options)
+            latencies = sorted(result['latencies']) or [0]
+            self.stdout.write(
+                f'{name:>14}: '
+                f'{len(result["latencies"]) / options["seconds"]:.0f} '
+                f'writes/s, {result["errors"]} locked, '
+                f'{result["reads"] / options["seconds"]:.0f} reads/s, '
+                f'write p50 {statistics.median(latencies) * 1000:.2f} ms, '
+                f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms'
+            )
+
+    @staticmethod
+    def connect(path, pragmas):
+        db = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(db, pragmas)
+        return db
+
+    def prepare(self, path, pragmas):
+        db = self.connect(path, pragmas)
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.executemany(
+            'INSERT INTO news (title) VALUES (?)',
+            ((f'Новость {index}',) for index in range(NEWS_COUNT))
+        )
+        db.close()
+
+    def run(self, path, pragmas, options):
+        self.result = {'latencies': [], 'errors': 0, 'reads': 0}
+        self.lock = threading.Lock()
+        self.deadline = time.monotonic() + options['seconds']
+        threads = [
+            threading.Thread(target=self.write, args=(path, pragmas, seed))
+            for seed in range(options['writers'])
+        ] + [
+            threading.Thread(target=self.read, args=(path, pragmas, -seed))
+            for seed in range(1, options['readers'] + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.result
+
+    def write(self, path, pragmas, seed):
+        rng = random.Random(seed)
+        db = self.connect(path, pragmas)
+        latencies, errors = [], 0
+        while time.monotonic() < self.deadline:
+            news_id = rng.randint(1, NEWS_COUNT)
+            started = time.perf_counter()
+            try:
+                db.execute(WRITE[0], (news_id,)).fetchone()
+                db.execute(WRITE[1], (news_id, 'Текст', time.time()))
+            except sqlite3.OperationalError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+        db.close()
+        with self.lock:
+            self.result['latencies'].extend(latencies)
+            self.result['errors'] += errors
+
+    def read(self, path, pragmas, seed):
+        rng = random.Random(seed)
+        db = self.connect(path, pragmas)
+        reads = 0
+        while time.monotonic() < self.deadline:
+            try:
+                db.execute(READ, (rng.randint(1, NEWS_COUNT),)).fetchall()
+            except sqlite3.OperationalError:
+                continue
+            reads += 1
+        db.close()
+        with self.lock:
+            self.result['reads'] += reads
@@ -0,0 +1,179 @@
+import csv
+import io
+import json
+import sys
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from news.cache import invalidate_news_pages
+from news.models import Comment, News
+from yacommon.bulk import Progress
+
+FORMATS = ('jsonl', 'csv')
+KINDS = ('news', 'comments')
+# Сколько имён авторов держать в кеше между пачками.
+AUTHOR_CACHE_SIZE: int = 100_000
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает новости или комментарии из JSONL или CSV '
+        '(файл или «-» для stdin) пачками bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Путь к файлу или «-» для stdin.')
+        parser.add_argument('--kind', choices=KINDS, default='news')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='По умолчанию определяется по расширению файла, иначе jsonl.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--progress-every',
+            type=float,
+            default=5.0,
+            help='Интервал отчёта о скорости, в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        source = options['source']
+        data_format = options['format'] or (
+            'csv' if source.endswith('.csv') else 'jsonl'
+        )
+        self.author_ids = {}
+        self.imported = self.skipped = 0
+        self.progress = Progress(self.stderr, options['progress_every'])
+        if source == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+            self.load(stream, data_format, options)
+        else:
+            try:
+                stream = Path(source).open(encoding='utf-8', newline='')
+            except OSError as error:
+                raise CommandError(error)
+            with stream:
+                self.load(stream, data_format, options)
+        elapsed = self.progress.elapsed()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {self.imported}, пропущено: {self.skipped}, '
+            f'{elapsed:.1f} с, {self.imported / (elapsed or 1):.0f} строк/с'
+        ))
+
+    def load(self, stream, data_format, options):
+        records = self.read(stream, data_format)
+        insert = (
+            self.insert_news if options['kind'] == 'news'
+            else self.insert_comments
+        )
+        while True:
+            batch = list(islice(records, options['batch_size']))
+            if not batch:
+                return
+            with transaction.atomic():
+                insert(batch)
+            self.progress.report(self.imported)
+
+    def read(self, stream, data_format):
+        if data_format == 'csv':
+            yield from csv.DictReader(stream)
+            return
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as error:
+                self.skip(f'строка {line_number}: {error}')
+                continue
+            if isinstance(record, dict):
+                yield record
+            else:
+                self.skip(f'строка {line_number}: запись не объект')
+
+    def skip(self, reason):
+        self.skipped += 1
+        self.stderr.write(f'Пропуск: {reason}')
+
+    def insert_news(self, batch):
+        news = []
+        for record in batch:
+            try:
+                news.append(self.build_news(record))
+            except ValidationError as error:
+                self.skip(f'{record!r}: {error.message_dict}')
+        News.objects.bulk_create(news)
+        self.imported += len(news)
+        if news:
+            invalidate_news_pages()
+
+    def build_news(self, record):
+        """
+        Новость из записи, проверенная валидаторами полей модели.
+
+        CSV отдаёт None за недостающие колонки, JSON — любые типы,
+        а bulk_create ничего не проверяет, так что без проверки
+        одна такая запись оборвала бы загрузку на IntegrityError.
+        """
+        fields = {name: record.get(name) for name in ('title', 'text')}
+        if record.get('date'):
+            fields['date'] = record['date']
+        for name, value in fields.items():
+            if not isinstance(value, str):
+                raise ValidationError({name: 'Ожидается строка.'})
+        news = News(**fields)
+        news.clean_fields()
+        return news
+
+    def insert_comments(self, batch):
+        self.resolve_authors({record.get('author') for record in batch})
+        for record in batch:
+            try:
+                record['news'] = int(record.get('news'))
+            except (TypeError, ValueError):
+                record['news'] = None
+        news_ids = set(News.objects.filter(
+            pk__in={record['news'] for record in batch}
+        ).values_list('pk', flat=True))
+        comments = []
+        for record in batch:
+            author_id = self.author_ids.get(record.get('author'))
+            text = record.get('text')
+            if author_id is None or record['news'] not in news_ids or (
+                not text or not isinstance(text, str)
+            ):
+                self.skip(f'{record!r}: нет автора, новости или текста')
+                continue
+            comments.append(Comment(
+                news_id=record['news'],
+                author_id=author_id,
+                text=text,
+            ))
+        Comment.objects.bulk_create(comments)
+        self.imported += len(comments)
+        if comments:
+            invalidate_news_pages(*{comment.news_id for comment in comments})
+
+    def resolve_authors(self, usernames):
+        """Находит авторов пачки одним запросом, известные берёт из кеша."""
+        missing = usernames - self.author_ids.keys() - {None}
+        if not missing:
+            return
+        if len(self.author_ids) + len(missing) > AUTHOR_CACHE_SIZE:
+            self.author_ids.clear()
+        self.author_ids.update(dict.fromkeys(missing))
+        self.author_ids.update(
+            User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk')
+        )
@@ -0,0 +1,170 @@
+import random
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from news.cache import invalidate_news_pages
+from news.models import Comment, News
+from yacommon.bulk import Progress, zipf_cum_weights
+
+WORDS = (
+    'выставка', 'кошек', 'в', 'городе', 'открылась', 'новая', 'линия',
+    'метро', 'учёные', 'нашли', 'способ', 'погода', 'на', 'выходные',
+    'футбольный', 'клуб', 'выиграл', 'кубок', 'цены', 'выросли', 'мэр',
+    'рассказал', 'о', 'планах', 'жители', 'жалуются', 'ремонт', 'дорог',
+    'фестиваль', 'музыки', 'прошёл', 'школьники', 'победили', 'олимпиаде',
+    'театр', 'премьера', 'спектакля', 'парк', 'закрыли', 'для', 'зима',
+    'снегопад', 'пробки', 'аэропорт', 'рейсы', 'задерживаются', 'ёлка',
+    'шоколад', 'щедрый', 'юбилей', 'экономика', 'чемпионат', 'цирк',
+)
+# Сколько разных фраз сгенерировать заранее: тексты собираются из них,
+# а не из отдельных слов, чтобы генерация не отставала от вставки.
+PHRASES_COUNT: int = 20_000
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, новостями '
+        'и комментариями для нагрузочных замеров. При одном и том же '
+        '--seed данные совпадают, кроме дат: они отсчитываются от сегодня.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--news', type=int, default=100_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=3650,
+            help='За сколько дней до сегодня распределить даты новостей.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--progress-every',
+            type=float,
+            default=5.0,
+            help='Интервал отчёта о скорости, в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['days'] < 1:
+            raise CommandError(
+                '--batch-size и --days должны быть положительными.'
+            )
+        if options['comments'] and not (options['users'] and options['news']):
+            raise CommandError(
+                'Для комментариев нужны хотя бы один пользователь '
+                'и одна новость.'
+            )
+        self.username_prefix = f'seed{options["seed"]}_'
+        if User.objects.filter(
+            username__startswith=self.username_prefix
+        ).exists():
+            raise CommandError(
+                f'Пользователи {self.username_prefix}* уже созданы, '
+                'укажите другой --seed.'
+            )
+        self.rng = random.Random(options['seed'])
+        self.phrases = [
+            self.sentence(3, 12) for _ in range(PHRASES_COUNT)
+        ]
+        self.batch_size = options['batch_size']
+        self.created = 0
+        self.progress = Progress(self.stderr, options['progress_every'])
+        user_ids = self.insert(User, self.make_users(options['users']))
+        news_ids = self.insert(
+            News, self.make_news(options['news'], options['days'])
+        )
+        self.insert(
+            Comment,
+            self.make_comments(options['comments'], news_ids, user_ids),
+        )
+        invalidate_news_pages()
+        elapsed = self.progress.elapsed()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {len(user_ids)} пользователей, {len(news_ids)} '
+            f'новостей, {options["comments"]} комментариев, '
+            f'{elapsed:.1f} с, {self.created / (elapsed or 1):.0f} строк/с'
+        ))
+
+    def insert(self, model, objects):
+        """
+        Вставляет объекты пачками bulk_create и возвращает их pk.
+
+        SQLite не возвращает pk из bulk_create, поэтому они читаются
+        одним запросом после вставки.
+        """
+        last_pk = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            self.created += len(batch)
+            self.progress.report(self.created)
+        return list(model.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    def sentence(self, min_words, max_words):
+        words = self.rng.choices(
+            WORDS, k=self.rng.randint(min_words, max_words)
+        )
+        return ' '.join(words).capitalize()
+
+    def paragraph(self, min_phrases, max_phrases):
+        phrases = self.rng.choices(
+            self.phrases, k=self.rng.randint(min_phrases, max_phrases)
+        )
+        return '. '.join(phrases) + '.'
+
+    def make_users(self, count):
+        for index in range(count):
+            yield User(
+                username=f'{self.username_prefix}{index}',
+                password=UNUSABLE_PASSWORD_PREFIX,
+            )
+
+    def make_news(self, count, days):
+        today = date.today()
+        title_length = News._meta.get_field('title').max_length
+        for _ in range(count):
+            yield News(
+                title=self.sentence(2, 6)[:title_length],
+                text=self.paragraph(1, 8),
+                date=today - timedelta(days=self.rng.randrange(days)),
+            )
+
+    def make_comments(self, count, news_ids, user_ids):
+        """
+        Комментарии с перекосом: популярность новостей и активность
+        читателей распределены по Ципфу, самые популярные выбраны
+        случайно, а не по порядку pk.
+        """
+        news_ids = self.rng.sample(news_ids, len(news_ids))
+        user_ids = self.rng.sample(user_ids, len(user_ids))
+        news_weights = zipf_cum_weights(len(news_ids))
+        user_weights = zipf_cum_weights(len(user_ids))
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            pairs = zip(
+                self.rng.choices(news_ids, cum_weights=news_weights, k=size),
+                self.rng.choices(user_ids, cum_weights=user_weights, k=size),
+            )
+            for news_id, author_id in pairs:
+                yield Comment(
+                    news_id=news_id,
+                    author_id=author_id,
+                    text=self.paragraph(1, 3),
+                )
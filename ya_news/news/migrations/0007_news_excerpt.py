@@ -0,0 +1,57 @@
+from importlib import import_module
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+fts = import_module('news.migrations.0005_news_fts')
+
+EXCERPT_WORDS = 15
+BATCH_SIZE = 1000
+# SQLite пересоздаёт таблицу при изменении полей, и триггеры
+# полнотекстового индекса пропадают вместе со старой таблицей.
+RESTORE_FTS_TRIGGERS = fts.DROP_FTS[:3] + fts.CREATE_FTS[1:4]
+
+
+def fill_excerpts(apps, schema_editor):
+    """Заполняет анонсы существующих новостей пачками по первичному ключу."""
+    News = apps.get_model('news', 'News')
+    news = News.objects.using(schema_editor.connection.alias).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(news.filter(pk__gt=last_pk).only('pk', 'text')[
+            :BATCH_SIZE
+        ])
+        if not batch:
+            return
+        for item in batch:
+            item.excerpt = Truncator(item.text).words(
+                EXCERPT_WORDS, truncate=' …'
+            )
+        News.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, ('excerpt',)
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_comment_created_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            fts.run_on_sqlite(RESTORE_FTS_TRIGGERS),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(
+            fts.run_on_sqlite(RESTORE_FTS_TRIGGERS),
+            migrations.RunPython.noop,
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
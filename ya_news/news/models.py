@@ -2,21 +2,80 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import Truncator
+
+# Сколько слов текста показывать в карточке новости.
+EXCERPT_WORDS: int = 15
+
+
+def make_excerpt(text):
+    """Обрезает текст так же, как фильтр truncatewords."""
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def with_comment_count(self):
+        """
+        Добавляет к новостям число комментариев.
+
+        Счётчик считается коррелированным подзапросом по индексу
+        news_id, поэтому сами комментарии в память не загружаются.
+        """
+        comment_count = Comment.objects.filter(
+            news=OuterRef('pk')
+        ).order_by().values('news').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.annotate(
+            comment_count=Coalesce(Subquery(comment_count), 0)
+        )
+
+    def for_cards(self):
+        """Новости для карточек списка: с анонсом, но без полного текста."""
+        return self.with_comment_count().defer('text')
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Заполняет анонсы, которые при обычном save() считает модель."""
+        objs = list(objs)
+        for news in objs:
+            news.update_excerpt()
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
+    excerpt = models.TextField(editable=False, blank=True)
     date = models.DateField(default=datetime.today)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-date',)
+        ordering = ('-date', '-id')
+        indexes = (
+            models.Index(fields=('date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def update_excerpt(self):
+        self.excerpt = make_excerpt(self.text)
+
+    def save(self, *args, update_fields=None, **kwargs):
+        """Пересчитывает анонс вместе с текстом."""
+        if update_fields is None or 'text' in update_fields:
+            self.update_excerpt()
+            if update_fields is not None:
+                update_fields = {*update_fields, 'excerpt'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -29,9 +88,17 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ('created',)
+        ordering = ('created', 'id')
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx',
+            ),
+            models.Index(fields=('created', 'id'), name='comment_created_idx'),
+        )
 
     def __str__(self):
         return self.text[:50]
@@ -0,0 +1,151 @@
+import logging
+import os
+import re
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BAD_WORDS = (
+    'редиска',
+    'негодяй',
+    # Дополните список на своё усмотрение.
+)
+
+# Латинские буквы и цифры, которыми подменяют похожие кириллические.
+LOOK_ALIKES = str.maketrans({
+    'ё': 'е',
+    'a': 'а',
+    'b': 'в',
+    'c': 'с',
+    'e': 'е',
+    'h': 'н',
+    'k': 'к',
+    'm': 'м',
+    'o': 'о',
+    'p': 'р',
+    't': 'т',
+    'x': 'х',
+    'y': 'у',
+    '0': 'о',
+    '3': 'з',
+    '6': 'б',
+})
+REPEATED_LETTERS = re.compile(r'(.)\1+')
+
+
+def normalize(text):
+    """Приводит текст к виду, в котором не работают простые обходы."""
+    return REPEATED_LETTERS.sub(r'\1', text.lower().translate(LOOK_ALIKES))
+
+
+class BadWordsMatcher:
+    """
+    Автомат Ахо — Корасик по нормализованному списку слов.
+
+    Строится один раз и проверяет текст за один проход,
+    независимо от длины списка.
+    """
+
+    def __init__(self, words):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.output = [None]
+        for word in words:
+            self._add(normalize(word))
+        self._link()
+
+    def _add(self, word):
+        if not word:
+            return
+        state = 0
+        for char in word:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions[state][char] = next_state
+                self.transitions.append({})
+                self.fail.append(0)
+                self.output.append(None)
+            state = next_state
+        self.output[state] = word
+
+    def _link(self):
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(
+                    char, 0
+                )
+                if self.output[next_state] is None:
+                    self.output[next_state] = self.output[
+                        self.fail[next_state]
+                    ]
+
+    def search(self, text):
+        """Возвращает первое найденное слово из списка или None."""
+        transitions, fail, output = self.transitions, self.fail, self.output
+        state = 0
+        for char in normalize(text):
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+def read_bad_words(path):
+    """Читает список слов из файла: по слову в строке, # — комментарий."""
+    with open(path, encoding='utf-8') as file:
+        return tuple(
+            word for word in (line.strip() for line in file)
+            if word and not word.startswith('#')
+        )
+
+
+def load_bad_words(path):
+    """Слова из файла, а если его не прочитать — встроенный список."""
+    try:
+        return read_bad_words(path)
+    except (OSError, UnicodeDecodeError) as error:
+        logger.warning(
+            'BAD_WORDS_FILE не прочитан, используется встроенный '
+            'список: %s', error
+        )
+        return BAD_WORDS
+
+
+def file_source(path):
+    """Путь и время изменения файла; у недоступного файла время None."""
+    try:
+        return path, os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None
+
+
+_matcher = None
+_matcher_source = None
+
+
+def get_bad_words_matcher():
+    """
+    Возвращает автомат, общий для процесса.
+
+    Если задан BAD_WORDS_FILE, автомат перестраивается
+    при изменении файла. Пока файл недоступен, проверка идёт
+    по встроенному списку, а не обрывает запрос ошибкой.
+    """
+    global _matcher, _matcher_source
+    path = settings.BAD_WORDS_FILE
+    source = file_source(path) if path else None
+    if _matcher is None or source != _matcher_source:
+        words = load_bad_words(path) if path else BAD_WORDS
+        _matcher, _matcher_source = BadWordsMatcher(words), source
+    return _matcher
@@ -2,6 +2,7 @@ from datetime import timedelta
 
 import pytest
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
 from news.models import Comment, News
@@ -16,6 +17,11 @@ NEW_NEWS_TEXT: str = 'Обновлённый текст заметки'
 NEW_NEWS_TITLE: str = 'Обновлённый заголовок заметки'
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
 @pytest.fixture
 def author(django_user_model):
     return django_user_model.objects.create(username=NEWS_AUTHOR_TEXT)
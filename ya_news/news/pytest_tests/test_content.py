@@ -1,11 +1,36 @@
+from http import HTTPStatus
+
 import pytest
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import Client
 from django.urls import reverse
+from django.views import View
 
+from news.cache import (CACHE_STATUS_HEADER, AnonymousPageCacheMixin,
+                        comment_fragment_key, news_card_key, stats)
 from news.forms import CommentForm
+from news.models import Comment, News
+from yacommon.cache import FRAGMENT_CACHE_ALIAS, get_fragment_cache
+from yacommon.metrics import registry
 
 NEWS_TITLE: str = 'Заголовок новости'
 NEWS_TEXT: str = 'Текст новости'
+COMMENT_TEXT: str = 'Текст комментария'
+PASSWORD: str = 'Пароль автора'
+NEW_COMMENT_TEXT: str = 'Обновлённый текст комментария'
+# Pages with validators spend one extra query on computing their ETag.
+HOME_PAGE_QUERIES: int = 2
+ARCHIVE_PAGE_QUERIES: int = 1
+DETAIL_PAGE_QUERIES: int = 3
+COMMENTS_ON_PAGE: int = 3
+CACHE_BACKENDS: tuple = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
 
 pytestmark = pytest.mark.django_db
 
@@ -37,6 +62,84 @@ def test_comments_order(client, news_with_comments, name, args):
     assert all_comments[0].created < all_comments[1].created
 
 
+@pytest.mark.parametrize('comments_count', (1, 10, 100))
+def test_home_page_queries_do_not_depend_on_comments(
+        client, django_assert_num_queries, news, author, comments_count
+):
+    """
+    Check that the home page runs a fixed number of queries
+    however many comments the news has
+    """
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'{COMMENT_TEXT} {index}')
+        for index in range(comments_count)
+    )
+    with django_assert_num_queries(HOME_PAGE_QUERIES):
+        response = client.get(reverse('news:home'))
+    assert response.context['object_list'][0].comment_count == comments_count
+    assert f'Комментариев: {comments_count}' in response.content.decode()
+
+
+@pytest.mark.parametrize('order, newest_first', (
+    ('oldest', False),
+    ('newest', True),
+))
+def test_comments_pages_on_detail(
+        client, settings, news, author, order, newest_first
+):
+    """
+    Check that the detail page and the comments fragment
+    page through all comments in the requested order
+    """
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = COMMENTS_ON_PAGE
+    comments = [
+        Comment.objects.create(
+            news=news, author=author, text=f'{COMMENT_TEXT} {index}'
+        )
+        for index in range(COMMENTS_ON_PAGE * 2 + 1)
+    ]
+    if newest_first:
+        comments.reverse()
+    response = client.get(
+        reverse('news:detail', args=(news.pk,)), {'order': order}
+    )
+    page = response.context['comments_page']
+    seen = list(page)
+    while page.has_next:
+        response = client.get(
+            reverse('news:comments', args=(news.pk,)),
+            {'order': order, 'cursor': page.next_cursor}
+        )
+        page = response.context['comments_page']
+        seen.extend(page)
+    assert seen == comments
+
+
+@pytest.mark.parametrize('comments_count', (1, 100))
+def test_detail_page_queries_do_not_depend_on_comments(
+        client, settings, django_assert_num_queries,
+        news, author, comments_count
+):
+    """
+    Check that the detail page loads only one page of comments
+    together with their authors in a fixed number of queries
+    """
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = COMMENTS_ON_PAGE
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'{COMMENT_TEXT} {index}')
+        for index in range(comments_count)
+    )
+    with django_assert_num_queries(DETAIL_PAGE_QUERIES):
+        response = client.get(reverse('news:detail', args=(news.pk,)))
+        content = response.content.decode()
+    assert len(response.context['comments_page']) == min(
+        comments_count, COMMENTS_ON_PAGE
+    )
+    assert content.count(author.username) == min(
+        comments_count, COMMENTS_ON_PAGE
+    )
+
+
 def test_news_order(client, news_list):
     """Check the order of displayed news articles on the home page"""
     response = client.get(reverse('news:home'))
@@ -46,6 +149,53 @@ def test_news_order(client, news_list):
     assert all_dates == sorted_dates
 
 
+@pytest.mark.parametrize('name', ('news:home', 'news:archive'))
+def test_news_cards_do_not_load_text(client, news_list, name):
+    """Check that news cards show the excerpt without loading the text"""
+    response = client.get(reverse(name))
+    for news in response.context['object_list']:
+        assert 'text' in news.get_deferred_fields()
+        assert news.excerpt in response.content.decode()
+
+
+def test_archive_pages_cover_all_news(client, settings, news_list):
+    """Check that archive pages list every news once in date order"""
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 3
+    url = reverse('news:archive')
+    seen = []
+    cursor = None
+    while True:
+        response = client.get(url, {'cursor': cursor} if cursor else None)
+        page = response.context['page_obj']
+        assert len(page) <= settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+        seen.extend(news.title for news in page)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    expected = sorted(news_list, key=lambda news: news.date, reverse=True)
+    assert seen == [news.title for news in expected]
+
+
+def test_archive_deep_page_costs_as_first(
+        client, settings, django_assert_num_queries, news_list
+):
+    """Check that a deep archive page runs as many queries as the first"""
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 2
+    url = reverse('news:archive')
+    with django_assert_num_queries(ARCHIVE_PAGE_QUERIES):
+        response = client.get(url)
+    cursor = response.context['page_obj'].next_cursor
+    for _ in range(3):
+        cursor = client.get(
+            url, {'cursor': cursor}
+        ).context['page_obj'].next_cursor
+    with django_assert_num_queries(ARCHIVE_PAGE_QUERIES):
+        response = client.get(url, {'cursor': cursor})
+    assert len(response.context['page_obj']) == (
+        settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+    )
+
+
 def test_anonymous_client_has_no_form(client, news_id_for_args):
     """
     Check that an anonymous user does not see
@@ -65,3 +215,303 @@ def test_authorized_client_has_form(news_id_for_args, author_client):
     response = author_client.get(detail_url)
     assert 'form' in response.context
     assert isinstance(response.context['form'], CommentForm)
+
+
+@pytest.fixture(params=CACHE_BACKENDS)
+def page_cache_backend(request, settings, tmp_path):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': request.param,
+            'LOCATION': str(tmp_path / 'cache'),
+        }
+    }
+    return request.param
+
+
+@pytest.mark.parametrize(
+    'name, args',
+    (
+        ('news:home', None),
+        ('news:detail', pytest.lazy_fixture('news_id_for_args')),
+    )
+)
+def test_anonymous_pages_are_cached(
+        client, django_assert_num_queries, page_cache_backend, name, args
+):
+    """Check that a repeated anonymous request is served from the cache"""
+    url = reverse(name, args=args)
+    hits = stats.hits
+    first = client.get(url)
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert first[CACHE_STATUS_HEADER] == 'miss'
+    assert second[CACHE_STATUS_HEADER] == 'hit'
+    assert second.content == first.content
+    assert stats.hits == hits + 1
+
+
+def test_comment_invalidates_cached_pages(
+        client, page_cache_backend, news, author
+):
+    """Check that a new comment drops the cached home and detail pages"""
+    urls = (reverse('news:home'), reverse('news:detail', args=(news.pk,)))
+    for url in urls:
+        client.get(url)
+    Comment.objects.create(news=news, author=author, text=COMMENT_TEXT)
+    for url in urls:
+        response = client.get(url)
+        assert response[CACHE_STATUS_HEADER] == 'miss'
+    assert COMMENT_TEXT in response.content.decode()
+
+
+def test_news_change_invalidates_cached_pages(client, news):
+    """Check that editing a news drops its cached pages"""
+    url = reverse('news:detail', args=(news.pk,))
+    client.get(url)
+    news.title = NEWS_TITLE + '!'
+    news.save()
+    response = client.get(url)
+    assert response[CACHE_STATUS_HEADER] == 'miss'
+    assert news.title in response.content.decode()
+
+
+def test_page_cache_requires_a_key(rf):
+    """Check that a cached view without a page key is a configuration error"""
+    class KeylessView(AnonymousPageCacheMixin, View):
+        def get(self, request):
+            return HttpResponse()
+
+    request = rf.get('/')
+    request.user = AnonymousUser()
+    with pytest.raises(ImproperlyConfigured):
+        KeylessView.as_view()(request)
+
+
+def test_authorized_pages_are_not_cached(author_client, news):
+    """Check that pages of an authorized user bypass the page cache"""
+    url = reverse('news:detail', args=(news.pk,))
+    for _ in range(2):
+        response = author_client.get(url)
+        assert CACHE_STATUS_HEADER not in response
+        assert 'form' in response.context
+
+
+def test_news_card_fragment_follows_signals(author_client, news, author):
+    """Check that a cached news card is dropped by news and comment signals"""
+    url = reverse('news:home')
+    author_client.get(url)
+    assert get_fragment_cache().get(news_card_key(news.pk)) is not None
+    # A queryset update sends no signals, so the card stays cached.
+    News.objects.filter(pk=news.pk).update(title=NEWS_TITLE + '?')
+    assert NEWS_TITLE + '?' not in author_client.get(url).content.decode()
+    news.title = NEWS_TITLE + '!'
+    news.save()
+    assert news.title in author_client.get(url).content.decode()
+    Comment.objects.create(news=news, author=author, text=COMMENT_TEXT)
+    assert 'Комментариев: 1' in author_client.get(url).content.decode()
+
+
+def test_fragments_are_kept_apart_from_pages(author_client, news):
+    """Check that template fragments are stored in their own cache"""
+    author_client.get(reverse('news:home'))
+    key = news_card_key(news.pk)
+    assert caches[FRAGMENT_CACHE_ALIAS].get(key) is not None
+    assert caches['default'].get(key) is None
+
+
+def test_comment_fragment_is_keyed_by_edit_time(
+        author_client, user, news, comment
+):
+    """Check that comment fragments are shared but follow comment edits"""
+    url = reverse('news:detail', args=(news.pk,))
+    user_client = Client()
+    user_client.force_login(user)
+    edit_url = reverse('news:edit', args=(comment.pk,))
+    assert edit_url in author_client.get(url).content.decode()
+    key = comment_fragment_key(comment.pk, comment.updated)
+    assert get_fragment_cache().get(key) is not None
+    content = user_client.get(url).content.decode()
+    assert COMMENT_TEXT in content
+    assert edit_url not in content
+    comment.text = NEW_COMMENT_TEXT
+    comment.save()
+    assert NEW_COMMENT_TEXT in user_client.get(url).content.decode()
+    key = comment_fragment_key(comment.pk, comment.updated)
+    assert get_fragment_cache().get(key) is not None
+    comment.delete()
+    assert get_fragment_cache().get(key) is None
+
+
+@pytest.mark.parametrize(
+    'name, args',
+    (
+        ('news:home', None),
+        ('news:detail', pytest.lazy_fixture('news_id_for_args')),
+    )
+)
+@pytest.mark.parametrize(
+    'parametrized_client',
+    (
+        pytest.lazy_fixture('client'),
+        pytest.lazy_fixture('author_client'),
+    )
+)
+def test_matching_etag_returns_not_modified(parametrized_client, name, args):
+    """Check that a matching If-None-Match is answered without rendering"""
+    url = reverse(name, args=args)
+    etag = parametrized_client.get(url)['ETag']
+    response = parametrized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not response.templates
+    assert not response.content
+
+
+def test_etag_changes_with_comments(author_client, news, author):
+    """Check that the detail page ETag changes when comments change"""
+    url = reverse('news:detail', args=(news.pk,))
+    etag = author_client.get(url)['ETag']
+    comment = Comment.objects.create(
+        news=news, author=author, text=COMMENT_TEXT
+    )
+    assert author_client.get(url)['ETag'] != etag
+    comment.delete()
+    assert author_client.get(url)['ETag'] == etag
+
+
+def test_etag_changes_after_login(client, author, news):
+    """
+    Check that logging in again changes the detail page ETag, so the
+    page is re-rendered with the rotated CSRF token
+    """
+    author.set_password(PASSWORD)
+    author.save()
+    credentials = {'username': author.username, 'password': PASSWORD}
+    url = reverse('news:detail', args=(news.pk,))
+    client.post(reverse('users:login'), credentials)
+    etag = client.get(url)['ETag']
+    client.get(reverse('users:logout'))
+    client.post(reverse('users:login'), credentials)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+def test_etag_differs_between_users(author_client, news):
+    """Check that anonymous and authorized users get different ETags"""
+    url = reverse('news:detail', args=(news.pk,))
+    assert Client().get(url)['ETag'] != author_client.get(url)['ETag']
+
+
+@pytest.fixture
+def searchable_news():
+    return [
+        News.objects.create(
+            title='Погода в Москве',
+            text='Завтра ожидается снегопад и сильный ветер.',
+        ),
+        News.objects.create(
+            title='Новости спорта',
+            text='Московский клуб выиграл матч, несмотря на погоду.',
+        ),
+        News.objects.create(
+            title='Выставка кошек',
+            text='В выходные откроется выставка породистых кошек.',
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    'query, expected_titles',
+    (
+        ('погода', ['Погода в Москве', 'Новости спорта']),
+        ('погоде', ['Погода в Москве', 'Новости спорта']),
+        ('выставкой', ['Выставка кошек']),
+        ('новостях', ['Новости спорта']),
+        ('снегопад ветер', ['Погода в Москве']),
+        ('жираф', []),
+        ('"*', []),
+    )
+)
+def test_search_ranks_matching_news(
+        client, searchable_news, query, expected_titles
+):
+    """Check that search finds word forms and ranks title matches first"""
+    response = client.get(reverse('news:search'), {'q': query})
+    titles = [news.title for news in response.context['object_list']]
+    assert titles == expected_titles
+
+
+def test_search_index_follows_changes(client, searchable_news):
+    """Check that the search index is kept in sync with the news table"""
+    url = reverse('news:search')
+    cats, *_ = reversed(searchable_news)
+    assert client.get(url, {'q': 'породистые'}).context['object_list']
+    cats.title = 'Выставка собак'
+    cats.text = 'В выходные откроется выставка собак.'
+    cats.save()
+    assert not client.get(url, {'q': 'породистые'}).context['object_list']
+    assert client.get(url, {'q': 'собаки'}).context['object_list']
+    cats.delete()
+    assert not client.get(url, {'q': 'собаки'}).context['object_list']
+
+
+def test_search_is_paginated(client, settings, news_list):
+    """Check that search results are split into pages"""
+    settings.NEWS_COUNT_ON_SEARCH_PAGE = 4
+    response = client.get(reverse('news:search'), {'q': NEWS_TITLE})
+    assert response.context['paginator'].count == len(news_list)
+    assert len(response.context['object_list']) == 4
+    last_page = client.get(
+        reverse('news:search'),
+        {'q': NEWS_TITLE, 'page': response.context['paginator'].num_pages}
+    )
+    assert len(last_page.context['object_list']) == len(news_list) % 4
+
+
+def test_metrics_are_recorded_per_view(client, settings, news):
+    """Check that request metrics are exported per URL name"""
+    settings.METRICS_SAMPLE_RATE = 1.0
+    registry.clear()
+    client.get(reverse('news:detail', args=(news.pk,)))
+    client.get(reverse('news:home'))
+    content = client.get(reverse('metrics')).content.decode()
+    for metric in (
+        'http_request_duration_seconds',
+        'http_request_db_queries',
+        'http_request_template_render_seconds',
+        'http_response_size_bytes',
+    ):
+        for view in ('news:detail', 'news:home'):
+            assert f'{metric}_count{{view="{view}"}} 1' in content
+
+
+def test_page_cache_counters_are_exported(client, news):
+    """Check that page cache hits and misses are exported with metrics"""
+    url = reverse('news:detail', args=(news.pk,))
+    client.get(url)
+    hits, misses = stats.hits, stats.misses
+    client.get(url)
+    content = client.get(reverse('metrics')).content.decode()
+    assert f'news_page_cache_hits_total {hits + 1}' in content
+    assert f'news_page_cache_misses_total {misses}' in content
+
+
+def test_server_timing_header(client, settings, news):
+    """Check that the Server-Timing header reports app, db and templates"""
+    settings.METRICS_SAMPLE_RATE = 1.0
+    settings.METRICS_SERVER_TIMING = True
+    response = client.get(reverse('news:detail', args=(news.pk,)))
+    assert [
+        timing.split(';')[0]
+        for timing in response['Server-Timing'].split(', ')
+    ] == ['app', 'db', 'tpl']
+
+
+def test_sampling_off_records_nothing(client, settings, news):
+    """Check that with sampling off requests are not measured"""
+    settings.METRICS_SAMPLE_RATE = 0
+    settings.METRICS_SERVER_TIMING = True
+    registry.clear()
+    response = client.get(reverse('news:home'))
+    assert 'Server-Timing' not in response
+    assert not registry.histograms
@@ -1,15 +1,52 @@
+import io
+import json
+import sqlite3
+import threading
+import time
 from http import HTTPStatus
 
 import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.text import Truncator
 
-from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.admin import HIDDEN_COMMENT_TEXT
+from news.cache import comment_fragment_key
+from news.forms import WARNING
+from news.models import EXCERPT_WORDS, Comment, News
+from news.moderation import BAD_WORDS, BadWordsMatcher
+from yacommon import db
+from yacommon.cache import get_fragment_cache
+from yacommon.benchmark import (PROC_CLEAR_REFS, RequestSpec, compare,
+                                login_cookies, peak_rss_mb,
+                                production_settings, reset_peak_rss,
+                                run_requests)
+from yacommon.querylog import RequestQueryLog
+from yanews.middleware import PIN_COOKIE, ReplicaPinningMiddleware
+from yanews.routers import PrimaryReplicaRouter, primary_pinned
 
 COMMENT_TEXT = 'Текст комментария'
 NEW_COMMENT_TEXT = 'Обновлённый текст комментария'
+NEWS_TITLE = 'Заголовок новости'
 EXPECTED_OPERATION_SUCCESS = 1
 EXPECTED_OPERATION_FAILURE = 0
+LONG_TEXT = ' '.join(f'слово{index}' for index in range(EXCERPT_WORDS * 2))
+CONCURRENT_WRITERS = 8
+COMMENTS_PER_WRITER = 10
+# How long another connection keeps the comments table locked, seconds.
+FOREIGN_LOCK_SECONDS = 0.05
+# Memory allocated before a peak RSS reset, bytes.
+BALLAST_BYTES = 64 * 1024 * 1024
+# Session, user, the view object and the write itself.
+WRITE_PATH_QUERIES = 4
 
 pytestmark = pytest.mark.django_db
 
@@ -38,6 +75,67 @@ def test_user_cant_use_bad_words(author_client, news):
     assert form_errors['text'][0] == WARNING
 
 
+@pytest.mark.parametrize(
+    'text',
+    (
+        'Ты РЕДИСКА',
+        'ты рeдиcкa',
+        'ты редииииска',
+        'ты рёдиска',
+        'нeг0дяяй!',
+    )
+)
+def test_bad_words_obfuscations_are_caught(text):
+    """Verifies that common obfuscations of bad words are caught"""
+    assert BadWordsMatcher(BAD_WORDS).search(text)
+
+
+@pytest.mark.parametrize(
+    'text',
+    (
+        'Обычный комментарий',
+        'редис и негода',
+        '',
+    )
+)
+def test_clean_text_passes_bad_words_matcher(text):
+    """Verifies that a clean comment is not flagged"""
+    assert BadWordsMatcher(BAD_WORDS).search(text) is None
+
+
+def test_matcher_finds_overlapping_words():
+    """Verifies that a word is found inside a longer partial match"""
+    matcher = BadWordsMatcher(('абвгд', 'вг'))
+    assert matcher.search('xабвгx') == 'вг'
+
+
+def test_bad_words_reloaded_from_file(
+        author_client, news, settings, tmp_path
+):
+    """Verifies that the bad words list is reloaded from a file"""
+    bad_words_file = tmp_path / 'bad_words.txt'
+    bad_words_file.write_text('# список\nзлодей\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = str(bad_words_file)
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data={'text': 'Вот злодей'})
+    assert response.context['form'].errors['text'][0] == WARNING
+    response = author_client.post(url, data={'text': BAD_WORDS[0]})
+    assert response.status_code == HTTPStatus.FOUND
+    assert Comment.objects.count() == EXPECTED_OPERATION_SUCCESS
+
+
+def test_missing_bad_words_file_falls_back(
+        author_client, news, settings, tmp_path
+):
+    """Verifies that a missing bad words file falls back to the built-ins"""
+    settings.BAD_WORDS_FILE = str(tmp_path / 'missing.txt')
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data={'text': BAD_WORDS[0]})
+    assert response.context['form'].errors['text'][0] == WARNING
+    response = author_client.post(url, data={'text': COMMENT_TEXT})
+    assert response.status_code == HTTPStatus.FOUND
+
+
 def test_author_can_delete_comment(author_client, news, comment):
     """Verifies that the author can delete their own comment"""
     url = reverse('news:delete', args=(news.id,))
@@ -78,3 +176,568 @@ def test_user_cant_edit_comment_of_another_user(
     response = user_client.post(url, data=comment_form_data)
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert Comment.objects.get().text == COMMENT_TEXT
+
+
+@pytest.mark.parametrize(
+    'name, args, data',
+    (
+        (
+            'news:detail',
+            pytest.lazy_fixture('news_id_for_args'),
+            pytest.lazy_fixture('comment_form_data'),
+        ),
+        (
+            'news:edit',
+            pytest.lazy_fixture('comment_id_for_args'),
+            pytest.lazy_fixture('comment_form_data'),
+        ),
+        ('news:delete', pytest.lazy_fixture('comment_id_for_args'), None),
+    )
+)
+def test_comment_write_paths_query_count(
+        author_client, django_assert_num_queries, comment, name, args, data
+):
+    """Verifies that comment write paths fetch their objects only once"""
+    url = reverse(name, args=args)
+    with django_assert_num_queries(WRITE_PATH_QUERIES):
+        response = author_client.post(url, data=data)
+    assert response.status_code == HTTPStatus.FOUND
+    assert response.url.startswith(
+        reverse('news:detail', args=(comment.news_id,)) + '?'
+    )
+    assert response.url.endswith('#comments')
+
+
+def test_written_comment_is_on_the_redirect_page(
+        author_client, settings, news, author, comment_form_data
+):
+    """Verifies that a new or edited comment is on the page redirected to"""
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'{COMMENT_TEXT} {index}')
+        for index in range(settings.COMMENTS_COUNT_ON_NEWS_PAGE * 3)
+    )
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data=comment_form_data, follow=True)
+    new_comment = Comment.objects.latest('id')
+    assert new_comment in response.context['comments_page']
+    middle = Comment.objects.filter(news=news)[
+        settings.COMMENTS_COUNT_ON_NEWS_PAGE + 5
+    ]
+    response = author_client.post(
+        reverse('news:edit', args=(middle.id,)),
+        data={'text': COMMENT_TEXT},
+        follow=True,
+    )
+    assert list(response.context['comments_page'])[0] == middle
+
+
+def test_import_news_from_jsonl(tmp_path):
+    """Verifies that news are imported in batches and broken rows skipped"""
+    source = tmp_path / 'news.jsonl'
+    lines = [
+        json.dumps({'title': f'Новость {index}', 'text': COMMENT_TEXT})
+        for index in range(5)
+    ]
+    lines.insert(2, '{broken')
+    lines.insert(3, '[1]')
+    lines.insert(4, '5')
+    lines.append(json.dumps({'title': 'Без текста'}))
+    lines.append(json.dumps(
+        {'title': 'С датой', 'text': COMMENT_TEXT, 'date': '2020-02-02'}
+    ))
+    source.write_text('\n'.join(lines), encoding='utf-8')
+    stdout = io.StringIO()
+    call_command(
+        'import_news',
+        str(source),
+        batch_size=2,
+        stdout=stdout,
+        stderr=io.StringIO(),
+    )
+    assert News.objects.count() == 6
+    assert 'пропущено: 4' in stdout.getvalue()
+    assert str(News.objects.get(title='С датой').date) == '2020-02-02'
+
+
+@pytest.mark.parametrize(
+    'record',
+    (
+        {'title': None, 'text': COMMENT_TEXT},
+        {'title': 'Без текста', 'text': None},
+        {'text': COMMENT_TEXT},
+        {'title': '', 'text': COMMENT_TEXT},
+        {'title': 'Длинная' * 10, 'text': COMMENT_TEXT},
+        {'title': 'Число', 'text': 5},
+        {'title': 'Дата', 'text': COMMENT_TEXT, 'date': 'вчера'},
+        {'title': 'Дата', 'text': COMMENT_TEXT, 'date': 20200202},
+    )
+)
+def test_import_news_skips_invalid_records(tmp_path, record):
+    """Verifies that a record failing field validation is skipped"""
+    source = tmp_path / 'news.jsonl'
+    source.write_text('\n'.join((
+        json.dumps(record),
+        json.dumps({'title': NEWS_TITLE, 'text': COMMENT_TEXT}),
+    )), encoding='utf-8')
+    stdout = io.StringIO()
+    call_command(
+        'import_news', str(source), stdout=stdout, stderr=io.StringIO()
+    )
+    assert list(News.objects.values_list('title', flat=True)) == [NEWS_TITLE]
+    assert 'пропущено: 1' in stdout.getvalue()
+
+
+def test_import_news_skips_short_csv_rows(tmp_path):
+    """Verifies that a CSV row with missing columns is skipped"""
+    source = tmp_path / 'news.csv'
+    source.write_text(
+        f'title,text\n{NEWS_TITLE}\n{NEWS_TITLE},{COMMENT_TEXT}\n',
+        encoding='utf-8'
+    )
+    call_command('import_news', str(source), stderr=io.StringIO())
+    assert News.objects.count() == 1
+
+
+def test_import_comments_from_csv(tmp_path, news, author):
+    """Verifies that comments are imported with authors resolved by name"""
+    source = tmp_path / 'comments.csv'
+    source.write_text(
+        'news,author,text\n'
+        f'{news.pk},{author.username},{COMMENT_TEXT}\n'
+        f'{news.pk},Незнакомец,{COMMENT_TEXT}\n'
+        f'{news.pk + 1},{author.username},{COMMENT_TEXT}\n'
+        f'{news.pk},{author.username},{NEW_COMMENT_TEXT}\n',
+        encoding='utf-8'
+    )
+    call_command('import_news', str(source), kind='comments')
+    assert list(
+        Comment.objects.values_list('author', 'text')
+    ) == [(author.pk, COMMENT_TEXT), (author.pk, NEW_COMMENT_TEXT)]
+
+
+def seed_news(**options):
+    call_command(
+        'seed_news', users=5, news=20, comments=300, batch_size=7, **options
+    )
+    return list(Comment.objects.order_by('id').values_list(
+        'news__title', 'news__text', 'author__username', 'text'
+    ))
+
+
+def test_seed_news_is_skewed():
+    """Verifies that seeded comments pile up on a few stories"""
+    seed_news()
+    assert News.objects.count() == 20
+    assert all(news.excerpt for news in News.objects.all())
+    counts = sorted(
+        News.objects.with_comment_count().values_list(
+            'comment_count', flat=True
+        ),
+        reverse=True,
+    )
+    assert sum(counts) == 300
+    assert counts[0] > 300 / 20 * 3
+
+
+def test_seed_news_is_repeatable(django_user_model):
+    """Verifies that the same seed produces the same rows"""
+    comments = seed_news()
+    with pytest.raises(CommandError):
+        seed_news()
+    django_user_model.objects.all().delete()
+    News.objects.all().delete()
+    assert seed_news() == comments
+
+
+def test_benchmark_drives_wsgi_application(news, author):
+    """Verifies that benchmark requests pass session and CSRF checks"""
+    cookies, token = login_cookies(author)
+    specs = [RequestSpec('GET', reverse('news:home'))] * 3 + [RequestSpec(
+        'POST',
+        reverse('news:detail', args=(news.pk,)),
+        {'text': COMMENT_TEXT, 'csrfmiddlewaretoken': token},
+        cookies,
+        HTTPStatus.FOUND,
+    )]
+    latencies, errors, _, peak_rss = run_requests(
+        'yanews.wsgi.application', specs, warmup=1
+    )
+    assert (len(latencies), errors) == (3, 0)
+    assert peak_rss > 0
+    assert Comment.objects.get().author == author
+
+
+@pytest.mark.skipif(
+    not PROC_CLEAR_REFS.exists(), reason='the peak RSS resets on Linux only'
+)
+def test_benchmark_peak_rss_is_reset():
+    """Verifies that earlier allocations do not count towards a new peak"""
+    ballast = b'x' * BALLAST_BYTES
+    peak = peak_rss_mb()
+    del ballast
+    reset_peak_rss()
+    assert peak_rss_mb() < peak - BALLAST_BYTES / 2 ** 21
+
+
+def test_benchmark_uses_cached_templates(settings):
+    """Verifies that the benchmark renders with the cached loader"""
+    settings.DEBUG = True
+    with production_settings():
+        engine = engines['django'].engine
+        assert not engine.debug
+        [loader] = engine.template_loaders
+        assert isinstance(loader, CachedLoader)
+
+
+def test_benchmark_comparison():
+    """Verifies that results are compared with the matching baseline"""
+    result = {
+        'scale': 'small', 'mode': 'thread', 'route': 'home',
+        'p50_ms': 1.0, 'p99_ms': 3.0, 'rps': 300.0, 'peak_rss_mb': 50.0,
+    }
+    baseline = {'results': [
+        {**result, 'p50_ms': 2.0, 'rps': 200.0},
+        {**result, 'route': 'detail'},
+    ]}
+    [(compared, changes)] = compare(baseline, [result])
+    assert compared is result
+    assert changes == {
+        'p50_ms': -50.0, 'p99_ms': 0.0, 'rps': 50.0, 'peak_rss_mb': 0.0,
+    }
+
+
+@pytest.mark.parametrize(
+    'action, statement',
+    (
+        ('hide_comments', 'UPDATE "news_comment"'),
+        ('delete_comments', 'DELETE FROM "news_comment"'),
+    )
+)
+def test_admin_moderation_runs_single_statement(
+        admin_client, client, author, news_with_comments, action, statement
+):
+    """
+    Verifies that bulk moderation runs one statement for a selection
+    larger than the ORM delete batch and drops the caches
+    """
+    news, comments = news_with_comments
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'{COMMENT_TEXT} {index}')
+        for index in range(len(comments), 150)
+    )
+    selected = list(
+        Comment.objects.filter(news=news).values_list('pk', flat=True)
+    )
+    detail_url = reverse('news:detail', args=(news.pk,))
+    assert comments[0].text in client.get(detail_url).content.decode()
+    fragment_key = comment_fragment_key(comments[0].pk, comments[0].updated)
+    assert get_fragment_cache().get(fragment_key) is not None
+    with CaptureQueriesContext(connection) as queries:
+        response = admin_client.post(
+            reverse('admin:news_comment_changelist'),
+            {'action': action, '_selected_action': selected}
+        )
+    assert response.status_code == HTTPStatus.FOUND
+    statements = [
+        query['sql'] for query in queries
+        if query['sql'].startswith(statement)
+    ]
+    assert len(statements) == 1
+    remaining = Comment.objects.filter(pk__in=selected)
+    if action == 'delete_comments':
+        assert not remaining.exists()
+        assert get_fragment_cache().get(fragment_key) is None
+    else:
+        assert set(remaining.values_list('text', flat=True)) == {
+            HIDDEN_COMMENT_TEXT
+        }
+    assert comments[0].text not in client.get(detail_url).content.decode()
+
+
+def test_admin_news_page_links_to_comments(admin_client, news_with_comments):
+    """Verifies that the news admin page does not render comment forms"""
+    news, comments = news_with_comments
+    response = admin_client.get(
+        reverse('admin:news_news_change', args=(news.pk,))
+    )
+    assert response.status_code == HTTPStatus.OK
+    content = response.content.decode()
+    assert 'comment_set-TOTAL_FORMS' not in content
+    assert f'news__id__exact={news.pk}' in content
+
+
+def test_excerpt_follows_text(news):
+    """Verifies that the excerpt is recalculated whenever the text is saved"""
+    news.text = LONG_TEXT
+    news.save(update_fields=('text',))
+    news.refresh_from_db()
+    assert news.excerpt == Truncator(LONG_TEXT).words(
+        EXCERPT_WORDS, truncate=' …'
+    )
+
+
+def test_bulk_created_news_have_excerpts():
+    """Verifies that bulk-created news get their excerpts too"""
+    News.objects.bulk_create(
+        News(title=str(index), text=LONG_TEXT) for index in range(3)
+    )
+    assert set(News.objects.values_list('excerpt', flat=True)) == {
+        Truncator(LONG_TEXT).words(EXCERPT_WORDS, truncate=' …')
+    }
+
+
+@pytest.mark.parametrize('pragma', ('busy_timeout', 'cache_size'))
+def test_sqlite_pragmas_are_applied(settings, pragma):
+    """Verifies that new connections get the configured SQLite pragmas"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {pragma}')
+        assert cursor.fetchone()[0] == settings.SQLITE_PRAGMAS[pragma]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_comments_are_not_lost(
+        settings, news, author, comment_form_data
+):
+    """
+    Verifies that comments posted from many threads are all saved
+    while another connection holds the comments table locked
+    """
+    settings.SQLITE_WRITE_ATTEMPTS = 10
+    url = reverse('news:detail', args=[news.id])
+    clients = []
+    for _ in range(CONCURRENT_WRITERS):
+        client = Client()
+        client.force_login(author)
+        clients.append(client)
+    foreign = sqlite3.connect(
+        **connection.get_connection_params(), isolation_level=None
+    )
+    foreign.execute('BEGIN IMMEDIATE')
+    foreign.execute('DELETE FROM news_comment')
+    release = threading.Timer(
+        FOREIGN_LOCK_SECONDS, foreign.execute, args=('COMMIT',)
+    )
+    retries = db.stats.retries
+    statuses = []
+
+    def post_comments(client):
+        try:
+            for _ in range(COMMENTS_PER_WRITER):
+                statuses.append(
+                    client.post(url, data=comment_form_data).status_code
+                )
+        finally:
+            connections.close_all()
+
+    threads = [release] + [
+        threading.Thread(target=post_comments, args=(client,))
+        for client in clients
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    foreign.close()
+    expected = CONCURRENT_WRITERS * COMMENTS_PER_WRITER
+    assert statuses == [HTTPStatus.FOUND] * expected
+    assert Comment.objects.filter(news=news).count() == expected
+    assert db.stats.retries > retries
+
+
+@pytest.mark.parametrize('model, pinned, expected', (
+    (News, False, 'replica'),
+    (Comment, False, 'replica'),
+    (News, True, 'default'),
+    (get_user_model(), False, None),
+))
+def test_router_reads(settings, model, pinned, expected):
+    """Verifies that news reads go to the replica unless pinned"""
+    settings.NEWS_REPLICA_DB_ALIAS = 'replica'
+    token = primary_pinned.set(pinned)
+    try:
+        assert PrimaryReplicaRouter().db_for_read(model) == expected
+    finally:
+        primary_pinned.reset(token)
+
+
+def test_router_writes_and_migrates_on_primary(settings):
+    """Verifies that writes and migrations never target the replica"""
+    settings.NEWS_REPLICA_DB_ALIAS = 'replica'
+    router = PrimaryReplicaRouter()
+    assert router.db_for_write(Comment) == 'default'
+    assert router.allow_migrate('replica', 'news') is False
+    assert router.allow_migrate('default', 'news') is None
+
+
+@pytest.mark.parametrize('method, cookies, pinned, sets_cookie', (
+    ('get', {}, False, False),
+    ('post', {}, True, True),
+    ('get', {PIN_COOKIE: '1'}, True, False),
+))
+def test_requests_after_write_read_primary(
+        rf, method, cookies, pinned, sets_cookie
+):
+    """Verifies that writes and the requests right after them are pinned"""
+    seen = []
+
+    def view(request):
+        seen.append(primary_pinned.get())
+        return HttpResponse()
+
+    request = getattr(rf, method)('/')
+    request.COOKIES.update(cookies)
+    response = ReplicaPinningMiddleware(view)(request)
+    assert seen == [pinned]
+    assert (PIN_COOKIE in response.cookies) == sets_cookie
+    assert primary_pinned.get() is False
+
+
+def copy_primary(path):
+    """Copies the primary test database into an SQLite file."""
+    target = sqlite3.connect(path)
+    connection.ensure_connection()
+    connection.connection.backup(target)
+    target.close()
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """
+    Replica in its own SQLite file, a snapshot of the primary.
+
+    Nothing replicates into it afterwards, so it lags behind every
+    later write until the test ends.
+    """
+    path = tmp_path / 'replica.sqlite3'
+    copy_primary(path)
+    alias = settings.NEWS_REPLICA_DB_ALIAS
+    connections.databases[alias] = {
+        **connections.databases['default'], 'NAME': str(path)
+    }
+    settings.DATABASE_ROUTERS = ['yanews.routers.PrimaryReplicaRouter']
+    settings.MIDDLEWARE = [
+        *settings.MIDDLEWARE, 'yanews.middleware.ReplicaPinningMiddleware'
+    ]
+    settings.NEWS_CACHE_TIMEOUT = settings.NEWS_REPLICA_PIN_SECONDS
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+    del connections.databases[alias]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pinned_reads_see_own_writes_on_replica_setup(author, news, replica):
+    """Verifies that a pinned read sees its write and others hit the replica"""
+    client = Client()
+    client.force_login(author)
+    url = reverse('news:detail', args=(news.pk,))
+    response = client.post(url, data={'text': COMMENT_TEXT})
+    assert response.status_code == HTTPStatus.FOUND
+    assert not Comment.objects.using(replica).exists()
+    assert COMMENT_TEXT in client.get(url).content.decode()
+    del client.cookies[PIN_COOKIE]
+    with CaptureQueriesContext(connections[replica]) as replica_queries:
+        content = client.get(url).content.decode()
+    assert COMMENT_TEXT not in content
+    assert replica_queries
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pages_filled_from_lagging_replica_expire(
+        author, news, replica, settings, monkeypatch
+):
+    """
+    Verifies that pages and news cards rendered from a lagging replica
+    are re-rendered once the pin period is over
+    """
+    author_client = Client()
+    author_client.force_login(author)
+    detail_url = reverse('news:detail', args=(news.pk,))
+    home_url = reverse('news:home')
+    Comment.objects.create(news=news, author=author, text=COMMENT_TEXT)
+    assert COMMENT_TEXT not in Client().get(detail_url).content.decode()
+    assert 'Комментариев' not in author_client.get(home_url).content.decode()
+    connections[replica].close()
+    copy_primary(connections.databases[replica]['NAME'])
+    assert COMMENT_TEXT not in Client().get(detail_url).content.decode()
+    now = time.time()
+    monkeypatch.setattr(
+        time, 'time', lambda: now + settings.NEWS_REPLICA_PIN_SECONDS + 1
+    )
+    assert COMMENT_TEXT in Client().get(detail_url).content.decode()
+    assert 'Комментариев: 1' in author_client.get(home_url).content.decode()
+
+
+def test_slow_queries_are_logged_with_plan(
+        client, settings, news_with_comments, caplog
+):
+    """Verifies that slow queries are logged with origin and query plan"""
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    news, _ = news_with_comments
+    client.get(reverse('news:detail', args=(news.pk,)))
+    comment_queries = [
+        record.getMessage() for record in caplog.records
+        if 'FROM "news_comment" INNER JOIN' in record.getMessage()
+    ]
+    assert len(comment_queries) == 1
+    assert 'news/views.py' in comment_queries[0]
+    assert 'comment_news_created_idx' in comment_queries[0]
+
+
+def test_slow_query_origin_includes_template(client, settings, news, caplog):
+    """Verifies that a query run while rendering names the template line"""
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    client.get(reverse('news:home'))
+    assert any(
+        'template news/home.html:' in record.getMessage()
+        for record in caplog.records
+    )
+
+
+def test_query_log_is_off_by_default(client, news, caplog):
+    """Verifies that nothing is logged without a threshold"""
+    client.get(reverse('news:detail', args=(news.pk,)))
+    assert not caplog.records
+
+
+def test_repeated_queries_are_flagged(
+        rf, settings, django_user_model, news, caplog
+):
+    """Verifies that per-comment author lookups are grouped as N+1"""
+    Comment.objects.bulk_create(
+        Comment(
+            news=news,
+            author=django_user_model.objects.create(username=f'user{index}'),
+            text=COMMENT_TEXT,
+        )
+        for index in range(settings.N_PLUS_ONE_THRESHOLD)
+    )
+    log = RequestQueryLog(rf.get('/'), threshold_ms=60_000)
+    with connection.execute_wrapper(log):
+        for comment in Comment.objects.all():
+            assert comment.author.username
+    log.report()
+    [record] = caplog.records
+    assert record.getMessage().startswith(
+        f'N+1 in /: {settings.N_PLUS_ONE_THRESHOLD} × SELECT'
+    )
+    assert 'auth_user' in record.getMessage()
+
+
+def test_identical_queries_are_not_n_plus_one(
+        rf, settings, news, author, caplog
+):
+    """Verifies that identical repeats are reported as duplicates only"""
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=COMMENT_TEXT)
+        for _ in range(settings.N_PLUS_ONE_THRESHOLD)
+    )
+    log = RequestQueryLog(rf.get('/'), threshold_ms=60_000)
+    with connection.execute_wrapper(log):
+        for comment in Comment.objects.all():
+            assert comment.author.username
+    log.report()
+    [record] = caplog.records
+    assert record.getMessage().startswith(
+        f'Duplicate query in /: {settings.N_PLUS_ONE_THRESHOLD} × SELECT'
+    )
@@ -0,0 +1,86 @@
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.urls import reverse
+
+from news.models import Comment, News
+from yacommon.testing import ACCEPTED_SCANS, capture_queries, full_scans
+
+NEWS_TITLE: str = 'Выставка кошек'
+NEWS_TEXT: str = 'Текст новости'
+COMMENT_TEXT: str = 'Текст комментария'
+SEARCH_QUERY: str = 'выставка'
+COMMENT_AUTHORS: int = 5
+# Route name, object in the URL, logged in, exact number of queries.
+# Logged-in requests spend two queries on the session and the user.
+ROUTE_BUDGETS = (
+    ('news:home', None, False, 2),
+    ('news:archive', None, False, 1),
+    ('news:search', None, False, 3),
+    ('news:detail', 'news', False, 3),
+    ('news:comments', 'news', False, 2),
+    ('news:detail', 'news', True, 5),
+    ('news:edit', 'comment', True, 4),
+    ('news:delete', 'comment', True, 4),
+)
+# The feed pages walk news_date_id_idx in ORDER BY order and stop at
+# LIMIT, so this index scan reads a single page rather than the table.
+NEWS_ACCEPTED_SCANS = (
+    *ACCEPTED_SCANS, 'SCAN news_news USING INDEX news_date_id_idx ',
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(params=('small', 'large'))
+def seeded(request, author, django_user_model):
+    """A single commented story, or several pages of news and comments."""
+    large = request.param == 'large'
+    news_count = settings.NEWS_COUNT_ON_HOME_PAGE * 3 if large else 1
+    comments_count = settings.COMMENTS_COUNT_ON_NEWS_PAGE * 3 if large else 1
+    authors = [author] + [
+        django_user_model.objects.create(username=f'{author.username}{i}')
+        for i in range(COMMENT_AUTHORS - 1)
+    ]
+    News.objects.bulk_create(
+        News(title=f'{NEWS_TITLE} {index}', text=NEWS_TEXT)
+        for index in range(news_count)
+    )
+    news = News.objects.latest('id')
+    Comment.objects.bulk_create(
+        Comment(
+            news=news,
+            author=authors[index % COMMENT_AUTHORS],
+            text=COMMENT_TEXT,
+        )
+        for index in range(comments_count)
+    )
+    Comment.objects.bulk_create(
+        Comment(news_id=other.pk, author=author, text=COMMENT_TEXT)
+        for other in News.objects.exclude(pk=news.pk)
+    )
+    return {
+        'news': news,
+        'comment': Comment.objects.filter(news=news, author=author).first(),
+    }
+
+
+@pytest.mark.parametrize('name, obj, logged_in, budget', ROUTE_BUDGETS)
+def test_route_query_budget(
+        client, author, seeded, name, obj, logged_in, budget
+):
+    """
+    Check that every route runs an exact number of queries whatever
+    the amount of data, and that none of them scans a whole table
+    """
+    if logged_in:
+        client.force_login(author)
+    url = reverse(name, args=(seeded[obj].pk,) if obj else None)
+    response, queries = capture_queries(
+        client, url, {'q': SEARCH_QUERY} if name == 'news:search' else None
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert len(queries) == budget
+    for sql, params in queries:
+        assert not full_scans(sql, params, NEWS_ACCEPTED_SCANS), sql
@@ -11,7 +11,9 @@ pytestmark = pytest.mark.django_db
     'name, args',
     (
         ('news:home', None),
+        ('news:archive', None),
         ('news:detail', pytest.lazy_fixture('news_id_for_args')),
+        ('news:comments', pytest.lazy_fixture('news_id_for_args')),
         ('users:login', None),
         ('users:logout', None),
         ('users:signup', None),
@@ -24,6 +26,12 @@ def test_pages_availability_for_anonymous_user(client, name, news, args):
     assert response.status_code == HTTPStatus.OK
 
 
+def test_archive_with_broken_cursor_is_not_found(client):
+    """Verifies that a malformed archive cursor yields 404"""
+    response = client.get(reverse('news:archive'), {'cursor': 'broken'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
 @pytest.mark.parametrize(
     'name, args',
     (
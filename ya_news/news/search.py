@@ -0,0 +1,96 @@
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import News
+
+WORD = re.compile(r'\w+')
+# Окончания русских слов, от длинных к коротким. Отрезав окончание,
+# ищем по префиксу основы: «новостях» найдёт «новость» и «новости».
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'иях', 'ого', 'его', 'ому', 'ему',
+    'ыми', 'ими', 'ать', 'ять', 'ить', 'еть', 'ешь', 'ишь', 'ет', 'ит',
+    'ут', 'ют', 'ат', 'ят', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ой',
+    'ей', 'ий', 'ый', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев',
+    'ою', 'ею', 'ую', 'юю', 'ия', 'ья', 'ть', 'ся', 'сь', 'а', 'я', 'о',
+    'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM_LENGTH: int = 3
+# Совпадение в заголовке весит больше, чем в тексте.
+TITLE_WEIGHT: float = 5.0
+TEXT_WEIGHT: float = 1.0
+
+
+def stem(word):
+    """Грубо отсекает окончание, оставляя основу не короче трёх букв."""
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= (
+            MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def build_match_query(query):
+    """Превращает строку поиска в запрос FTS5 по префиксам основ."""
+    return ' '.join(
+        '"{}"*'.format(stem(word).replace('"', '""'))
+        for word in WORD.findall(query.lower())
+    )
+
+
+class NewsSearchResults:
+    """
+    Результаты поиска по индексу news_news_fts.
+
+    Поддерживает count() и срезы, поэтому подходит для Paginator:
+    из индекса читаются только id нужной страницы, упорядоченные по bm25.
+    """
+
+    def __init__(self, query, using):
+        self.match = build_match_query(query)
+        self.using = using
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM news_news_fts '
+                'WHERE news_news_fts MATCH %s',
+                (self.match,)
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('Поддерживаются только срезы без шага.')
+        if not self.match:
+            return []
+        start = key.start or 0
+        limit = -1 if key.stop is None else max(key.stop - start, 0)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM news_news_fts '
+                'WHERE news_news_fts MATCH %s '
+                'ORDER BY bm25(news_news_fts, %s, %s) '
+                'LIMIT %s OFFSET %s',
+                (self.match, TITLE_WEIGHT, TEXT_WEIGHT, limit, start)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        news = News.objects.using(self.using).for_cards().in_bulk(ids)
+        return [news[pk] for pk in ids if pk in news]
+
+
+def search_news(query):
+    """Ищет новости; без SQLite — медленным перебором по icontains."""
+    using = router.db_for_read(News)
+    if connections[using].vendor == 'sqlite':
+        return NewsSearchResults(query, using)
+    return News.objects.for_cards().filter(
+        Q(title__icontains=query) | Q(text__icontains=query)
+    )
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from yacommon.cache import get_fragment_cache
+
+from .cache import comment_fragment_key, invalidate_news_pages
+from .models import Comment, News
+
+
+@receiver((post_save, post_delete), sender=News)
+def news_changed(sender, instance, **kwargs):
+    invalidate_news_pages(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate_news_pages(instance.news_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # После правки ключ фрагмента меняется сам, вместе со временем
+    # изменения; удалённый комментарий больше не выводится.
+    get_fragment_cache().delete(
+        comment_fragment_key(instance.pk, instance.updated)
+    )
@@ -1,39 +1,149 @@
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
 from django.views import generic
+from django.views.decorators.http import condition
 
+from yacommon.db import serialized_write
+from yacommon.pagination import (KeysetPaginationMixin, encode_cursor_at,
+                                 paginate_keyset)
+
+from .cache import (AnonymousPageCacheMixin, detail_page_key,
+                    home_page_key)
+from .conditional import news_detail_etag, news_list_etag
 from .forms import CommentForm
 from .models import Comment, News
-
-
-class NewsList(generic.ListView):
+from .search import search_news
+
+COMMENT_ORDERS = {
+    'oldest': False,
+    'newest': True,
+}
+DEFAULT_COMMENT_ORDER = 'oldest'
+# Порядок страницы, на которую ведёт комментарий после записи:
+# новый комментарий на ней первый.
+WRITTEN_COMMENT_ORDER = 'newest'
+COMMENT_KEYSET_FIELDS = ('created', 'id')
+
+
+def comment_page_url(comment):
+    """Адрес страницы комментариев новости, которая начинается с comment."""
+    cursor = encode_cursor_at(
+        comment, COMMENT_KEYSET_FIELDS, COMMENT_ORDERS[WRITTEN_COMMENT_ORDER]
+    )
+    return '{}?{}#comments'.format(
+        reverse('news:detail', kwargs={'pk': comment.news_id}),
+        urlencode({'order': WRITTEN_COMMENT_ORDER, 'cursor': cursor}),
+    )
+
+
+@method_decorator(condition(etag_func=news_list_etag), name='get')
+class NewsList(AnonymousPageCacheMixin, generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
 
+    def get_page_cache_key(self):
+        return home_page_key()
+
     def get_queryset(self):
         """
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.for_cards()[
+            :settings.NEWS_COUNT_ON_HOME_PAGE
+        ]
 
 
-class NewsDetail(generic.DetailView):
+class NewsArchive(KeysetPaginationMixin, generic.ListView):
+    """Архив всех новостей с постраничной навигацией по курсору."""
     model = News
-    template_name = 'news/detail.html'
+    template_name = 'news/archive.html'
+    keyset_fields = ('date', 'id')
+
+    def get_queryset(self):
+        return self.model.objects.for_cards()
+
+    def get_paginate_by(self, queryset):
+        return settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+
+
+class NewsSearch(generic.ListView):
+    """Полнотекстовый поиск по новостям, лучшие совпадения первыми."""
+    template_name = 'news/search.html'
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        if not self.query:
+            return []
+        return search_news(self.query)
+
+    def get_paginate_by(self, queryset):
+        return settings.NEWS_COUNT_ON_SEARCH_PAGE
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(query=self.query, **kwargs)
+
+
+class CachedObjectMixin:
+    """
+    Запоминает объект представления на время запроса.
+
+    Экземпляр CBV создаётся на каждый запрос, поэтому повторные вызовы
+    get_object() в post() и get_success_url() обходятся без запросов к БД.
+    """
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_cached_object'):
+            self._cached_object = super().get_object()
+        return self._cached_object
+
+
+class CommentsPageMixin:
+    """
+    Страница комментариев к новости.
+
+    Комментарии листаются курсором по (created, id), авторы подгружаются
+    только для комментариев текущей страницы.
+    """
+
+    def get_comments_page(self, news):
+        order = self.request.GET.get('order')
+        if order not in COMMENT_ORDERS:
+            order = DEFAULT_COMMENT_ORDER
+        page = paginate_keyset(
+            news.comment_set.select_related('author'),
+            COMMENT_KEYSET_FIELDS,
+            self.request.GET.get('cursor'),
+            settings.COMMENTS_COUNT_ON_NEWS_PAGE,
+            descending=COMMENT_ORDERS[order],
         )
-        return obj
+        page.order = order
+        return page
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments_page'] = self.get_comments_page(self.object)
+        return context
+
+
+@method_decorator(condition(etag_func=news_detail_etag), name='get')
+class NewsDetail(
+        AnonymousPageCacheMixin,
+        CommentsPageMixin,
+        generic.DetailView
+):
+    model = News
+    template_name = 'news/detail.html'
+
+    def get_page_cache_key(self):
+        return detail_page_key(self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +152,16 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class NewsComments(CommentsPageMixin, generic.DetailView):
+    """Фрагмент со следующей страницей комментариев к новости."""
+    model = News
+    template_name = 'news/comments.html'
+
+
 class NewsComment(
         LoginRequiredMixin,
+        CachedObjectMixin,
+        CommentsPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -55,38 +173,39 @@ class NewsComment(
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
+    @serialized_write
     def form_valid(self, form):
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
         comment.save()
+        self.comment = comment
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return comment_page_url(self.comment)
 
 
 class NewsDetailView(generic.View):
+    # Вложенные представления собираются один раз при импорте модуля.
+    detail_view = staticmethod(NewsDetail.as_view())
+    comment_view = staticmethod(NewsComment.as_view())
 
     def get(self, request, *args, **kwargs):
-        view = NewsDetail.as_view()
-        return view(request, *args, **kwargs)
+        return self.detail_view(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
-        view = NewsComment.as_view()
-        return view(request, *args, **kwargs)
+        return self.comment_view(request, *args, **kwargs)
 
 
-class CommentBase(LoginRequiredMixin):
+class CommentBase(LoginRequiredMixin, CachedObjectMixin):
     """Базовый класс для работы с комментариями."""
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
-        return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
-        ) + '#comments'
+        # Комментариев у новости может быть больше, чем на одной
+        # странице, а курсор приводит прямо к этому месту.
+        return comment_page_url(self.get_object())
 
     def get_queryset(self):
         """Пользователь может работать только со своими комментариями."""
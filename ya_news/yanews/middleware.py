@@ -0,0 +1,36 @@
+from django.conf import settings
+
+from .routers import primary_pinned
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'TRACE'})
+PIN_COOKIE: str = 'news_primary'
+
+
+class ReplicaPinningMiddleware:
+    """
+    Закрепляет за основной базой запросы на запись и следующие за ними.
+
+    После записи браузер получает куку на NEWS_REPLICA_PIN_SECONDS:
+    пока реплика догоняет основную базу, его чтение тоже идёт в основную,
+    и после перехода к #comments новый комментарий уже виден.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in SAFE_METHODS
+        token = primary_pinned.set(writes or PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            primary_pinned.reset(token)
+        if writes:
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=settings.NEWS_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
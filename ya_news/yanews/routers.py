@@ -0,0 +1,44 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Приложения, чтение которых можно отдать реплике.
+REPLICA_APPS = frozenset({'news'})
+
+# Читать ли в текущем запросе с основной базы, см. ReplicaPinningMiddleware.
+primary_pinned = ContextVar('primary_pinned', default=False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Чтение новостей и комментариев — с реплики, запись — в основную базу.
+
+    Пока запрос закреплён за основной базой (primary_pinned), чтение
+    тоже идёт туда: пользователь сразу видит то, что только что записал.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        if primary_pinned.get():
+            return DEFAULT_DB_ALIAS
+        return settings.NEWS_REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Реплика хранит те же строки, что и основная база."""
+        databases = {DEFAULT_DB_ALIAS, settings.NEWS_REPLICA_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        """Реплика повторяет основную базу и не мигрирует сама."""
+        if db == settings.NEWS_REPLICA_DB_ALIAS:
+            return False
+        return None
@@ -1,9 +1,16 @@
+import os
+import sys
 from pathlib import Path
 
 from django.urls import reverse_lazy
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Общий для обоих проектов код (пакет yacommon) лежит в корне репозитория.
+REPOSITORY_DIR = str(BASE_DIR.parent)
+if REPOSITORY_DIR not in sys.path:
+    sys.path.append(REPOSITORY_DIR)
+
 SECRET_KEY = 'django-insecure-7)dgs++2!#==aye4rd=5)c)bw0eokiyqx0hts6#t80!$c&$s+('
 
 DEBUG = True
@@ -21,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yacommon.metrics.MetricsMiddleware',
+    'yacommon.querylog.QueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -32,17 +41,33 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yanews.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Профили загрузки шаблонов: 'cached' разбирает шаблон один раз
+# на процесс, 'reload' — на каждый рендер, чтобы правки были видны
+# без перезапуска. По умолчанию профиль следует DEBUG.
+TEMPLATE_PROFILES = {
+    'reload': TEMPLATE_LOADERS,
+    'cached': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
+}
+TEMPLATE_PROFILE = os.environ.get(
+    'YANEWS_TEMPLATE_PROFILE', 'reload' if DEBUG else 'cached'
+)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_PROFILES[TEMPLATE_PROFILE],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'news.context_processors.cache_timeout',
             ],
         },
     },
@@ -53,11 +78,78 @@ WSGI_APPLICATION = 'yanews.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yacommon.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переживает запрос, а с ним и настройки SQLITE_PRAGMAS.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Выполняются на каждом новом соединении, см. yacommon/sqlite3/base.py.
+SQLITE_PRAGMAS = {
+    # Читатели не ждут писателя, а писатель — читателей.
+    'journal_mode': 'WAL',
+    # В режиме WAL это безопасно и избавляет от fsync на каждой записи.
+    'synchronous': 'NORMAL',
+    # Сколько миллисекунд ждать занятую базу вместо «database is locked».
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер кеша страниц в КиБ.
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+# Сколько раз выполнять запись, если база всё же оказалась занята,
+# и базовая задержка между попытками в секундах (растёт вдвое).
+SQLITE_WRITE_ATTEMPTS = 5
+SQLITE_WRITE_RETRY_DELAY = 0.05
+
+# Доля запросов, для которых yacommon.metrics собирает метрики;
+# 0 выключает замеры. Метрики отдаются по адресу /metrics/.
+METRICS_SAMPLE_RATE = 1.0
+# Добавлять ли к ответам заголовок Server-Timing.
+METRICS_SERVER_TIMING = DEBUG
+
+# Журнал медленных запросов yacommon.querylog: порог в миллисекундах,
+# None — выключен. Запросы дольше порога пишутся в лог с планом
+# EXPLAIN QUERY PLAN и местом в коде или шаблоне.
+SLOW_QUERY_THRESHOLD_MS = None
+# Сколько раз за HTTP-запрос один SQL должен выполниться с разными
+# параметрами, чтобы считаться N+1, или с одинаковыми — дублем.
+N_PLUS_ONE_THRESHOLD = 5
+
+# Реплика для чтения новостей, например копия базы, которую обновляет
+# внешняя репликация: YANEWS_REPLICA_DB=/srv/yanews/replica.sqlite3.
+# Без переменной окружения всё читается из основной базы.
+NEWS_REPLICA_DB_ALIAS = 'replica'
+# Сколько секунд после записи читать из основной базы.
+NEWS_REPLICA_PIN_SECONDS = 10
+if os.environ.get('YANEWS_REPLICA_DB'):
+    DATABASES[NEWS_REPLICA_DB_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': os.environ['YANEWS_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['yanews.routers.PrimaryReplicaRouter']
+    MIDDLEWARE.append('yanews.middleware.ReplicaPinningMiddleware')
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Фрагменты {% cache %}: ключи строятся из (id, updated) и после
+    # правки больше не читаются. В своём кеше они вытесняют друг друга,
+    # а не страницы и другие записи без срока в default.
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template_fragments',
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +172,22 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+NEWS_COUNT_ON_ARCHIVE_PAGE = 10
+NEWS_COUNT_ON_SEARCH_PAGE = 10
+COMMENTS_COUNT_ON_NEWS_PAGE = 20
+
+# Кеш страниц для анонимных читателей. Записи сбрасывают сигналы
+# news.signals; подходит и FileBasedCache.
+NEWS_PAGE_CACHE_ENABLED = True
+NEWS_PAGE_CACHE_ALIAS = 'default'
+# Срок страниц и карточек новостей в кеше, в секундах. Без реплики
+# записи живут до сброса. С репликой страница, собранная сразу после
+# записи, может прочитать отстающие данные, поэтому живёт не дольше,
+# чем чтение закреплено за основной базой.
+NEWS_CACHE_TIMEOUT = (
+    NEWS_REPLICA_PIN_SECONDS if NEWS_REPLICA_DB_ALIAS in DATABASES else None
+)
+
+# Файл со списком запрещённых слов, по слову в строке.
+# Если не задан, используется news.moderation.BAD_WORDS.
+BAD_WORDS_FILE = None
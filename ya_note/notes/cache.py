@@ -0,0 +1,8 @@
+from django.core.cache.utils import make_template_fragment_key
+
+# Имя фрагмента строки в шаблоне списка заметок.
+NOTE_ROW_FRAGMENT: str = 'note_row'
+
+
+def note_row_key(note_id, updated):
+    return make_template_fragment_key(NOTE_ROW_FRAGMENT, (note_id, updated))
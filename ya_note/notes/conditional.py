@@ -0,0 +1,64 @@
+import hashlib
+
+from django.conf import settings
+from django.middleware.csrf import get_token
+
+from yacommon.pagination import paginate_keyset
+
+from .models import NOTE_LIST_FIELDS, Note
+
+
+def make_etag(request, state):
+    """
+    Собирает ETag из состояния заметок и адреса страницы.
+
+    CSRF-токен входит в ETag, потому что он меняется при входе,
+    а ответ 304 оставил бы в формах страницы старый токен.
+    """
+    # get_token() каждый раз маскирует токен заново, поэтому в ETag
+    # идёт значение cookie; вызов выставит cookie, если её ещё нет.
+    get_token(request)
+    return hashlib.md5(repr((
+        request.user.pk,
+        request.META['CSRF_COOKIE'],
+        request.get_full_path(),
+        state,
+    )).encode()).hexdigest()
+
+
+def notes_list_etag(request):
+    """
+    Версия страницы списка: выведенные на ней поля заметок.
+
+    Запрос тот же, что строит страницу, поэтому его цена
+    не зависит от общего числа заметок пользователя.
+    """
+    page = paginate_keyset(
+        Note.objects.filter(author=request.user).only(*NOTE_LIST_FIELDS),
+        ('id',),
+        request.GET.get('cursor'),
+        settings.NOTES_COUNT_ON_LIST_PAGE,
+    )
+    return make_etag(request, (
+        [
+            tuple(getattr(note, field) for field in NOTE_LIST_FIELDS)
+            for note in page
+        ],
+        page.next_cursor,
+    ))
+
+
+def note_detail_last_modified(request, slug):
+    """Время правки заметки; запоминается на запросе для note_detail_etag."""
+    if not hasattr(request, '_note_updated'):
+        request._note_updated = Note.objects.filter(
+            author=request.user, slug=slug
+        ).values_list('updated', flat=True).first()
+    return request._note_updated
+
+
+def note_detail_etag(request, slug):
+    updated = note_detail_last_modified(request, slug)
+    if updated is None:
+        return None
+    return make_etag(request, updated)
@@ -1,10 +1,13 @@
+import zipfile
+from pathlib import PurePosixPath
+
 from django import forms
-from django.core.exceptions import ValidationError
-from pytils.translit import slugify
 
 from .models import Note
+from .transfer import IMPORT_READERS
 
 WARNING: str = ' - такой slug уже существует, придумайте уникальное значение!'
+IMPORT_FORMAT_ERROR: str = 'Загрузите файл .jsonl или .zip из выгрузки.'
 
 
 class NoteForm(forms.ModelForm):
@@ -14,15 +17,29 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+    def validate_unique(self):
+        """
+        Не проверяет уникальность slug отдельным запросом.
+
+        Пустой slug подберёт модель, а занятый явно указанный
+        отвергнет уникальный индекс при сохранении (см. NoteFormMixin).
+        """
+
+
+class NoteImportForm(forms.Form):
+    """Форма загрузки заметок из файла выгрузки."""
+    file = forms.FileField(
+        label='Файл',
+        help_text='JSONL или zip-архив с файлами Markdown'
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        suffix = PurePosixPath(upload.name).suffix.lower()
+        if suffix not in IMPORT_READERS or (
+            suffix == '.zip' and not zipfile.is_zipfile(upload)
+        ):
+            raise forms.ValidationError(IMPORT_FORMAT_ERROR)
+        upload.seek(0)
+        self.cleaned_data['reader'] = IMPORT_READERS[suffix]
+        return upload
@@ -0,0 +1,107 @@
+from http import HTTPStatus
+from itertools import count as counter
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+from notes.models import Note
+from yacommon.benchmark import BenchmarkCommand, RequestSpec, login_cookies
+
+NOTE_TITLE: str = 'Заметка из нагрузочного замера'
+NOTE_TEXT: str = 'Текст заметки из нагрузочного замера'
+# Параметры seed_notes для каждого масштаба данных. Замер идёт от имени
+# первого, самого активного автора.
+SCALES = {
+    'small': {
+        'users': 20, 'notes': 5_000, 'heavy_users': 1, 'heavy_notes': 2_000,
+    },
+    'medium': {
+        'users': 200, 'notes': 200_000, 'heavy_users': 2,
+        'heavy_notes': 50_000,
+    },
+    'large': {
+        'users': 1_000, 'notes': 1_000_000, 'heavy_users': 5,
+        'heavy_notes': 50_000,
+    },
+}
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = (
+        'Замеряет задержки, запросы в секунду и память на маршрутах '
+        'заметок через yanote.wsgi.application во временной базе, '
+        'заполненной seed_notes.'
+    )
+    application = 'yanote.wsgi.application'
+    scales = SCALES
+    # Удаление идёт последним: до него заметки автора не кончаются.
+    routes = ('list', 'detail', 'add', 'edit', 'delete')
+
+    def prepare(self, scale, seed):
+        call_command('seed_notes', seed=seed, **SCALES[scale])
+        author = User.objects.get(username=f'seed{seed}_0')
+        self.slugs = list(
+            Note.objects.filter(author=author).values_list('slug', flat=True)
+        )
+        self.rng.shuffle(self.slugs)
+        self.numbers = counter()
+        self.cookies, self.csrf_token = login_cookies(author)
+
+    def request(self, method, path, data=None):
+        if method == 'POST':
+            data = {**(data or {}), 'csrfmiddlewaretoken': self.csrf_token}
+        return RequestSpec(
+            method,
+            path,
+            data,
+            self.cookies,
+            HTTPStatus.FOUND if method == 'POST' else HTTPStatus.OK,
+        )
+
+    def sample_slugs(self, count):
+        return self.rng.choices(self.slugs, k=count)
+
+    def route_list(self, count):
+        return [self.request('GET', reverse('notes:list'))] * count
+
+    def route_detail(self, count):
+        return [
+            self.request('GET', reverse('notes:detail', args=(slug,)))
+            for slug in self.sample_slugs(count)
+        ]
+
+    def route_add(self, count):
+        # Slug подбирает модель, заголовки не повторяются.
+        return [
+            self.request('POST', reverse('notes:add'), {
+                'title': f'{NOTE_TITLE} {next(self.numbers)}',
+                'text': NOTE_TEXT,
+                'slug': '',
+            })
+            for _ in range(count)
+        ]
+
+    def route_edit(self, count):
+        return [
+            self.request('POST', reverse('notes:edit', args=(slug,)), {
+                'title': NOTE_TITLE, 'text': NOTE_TEXT, 'slug': slug,
+            })
+            for slug in self.sample_slugs(count)
+        ]
+
+    def route_delete(self, count):
+        if count > len(self.slugs):
+            raise CommandError(
+                f'Для удаления нужно {count} заметок, а у автора '
+                f'{len(self.slugs)}: уменьшите --requests или '
+                'возьмите больший --scale.'
+            )
+        slugs, self.slugs = self.slugs[:count], self.slugs[count:]
+        return [
+            self.request('POST', reverse('notes:delete', args=(slug,)))
+            for slug in slugs
+        ]
@@ -0,0 +1,55 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+from pytils.translit import slugify
+
+from notes.slugs import cached_slugify, slugify_cache_info
+from notes.wordlist import WORDS
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает транслитерацию заголовков через pytils '
+        'и через кеширующую обёртку cached_slugify.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=50_000)
+        parser.add_argument('--distinct', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        distinct = [
+            ' '.join(rng.choices(WORDS, k=rng.randint(2, 6))).capitalize()
+            for _ in range(options['distinct'])
+        ]
+        # Популярные заголовки повторяются чаще: «Список покупок»
+        # встречается у многих, а каждый заголовок за запрос
+        # транслитерируется дважды — в форме и в модели.
+        corpus = [
+            title
+            for title in rng.choices(
+                distinct,
+                weights=[1 / rank for rank in range(1, len(distinct) + 1)],
+                k=options['titles'],
+            )
+            for _ in range(2)
+        ]
+        cached_slugify.cache_clear()
+        variants = (('pytils', slugify), ('cached', cached_slugify))
+        for name, function in variants:
+            total = timeit.timeit(
+                lambda: [function(title) for title in corpus], number=1
+            )
+            self.stdout.write(
+                f'{name:>7}: {total * 1000:.1f} ms for {len(corpus)} titles, '
+                f'{total / len(corpus) * 1e6:.2f} us per title'
+            )
+        info = slugify_cache_info()
+        self.stdout.write(
+            f'cache: {info.hits} hits, {info.misses} misses, '
+            f'hit rate {info.hits / (info.hits + info.misses):.1%}, '
+            f'{info.currsize}/{info.maxsize} entries'
+        )
@@ -0,0 +1,174 @@
+import random
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notes.models import Note
+from notes.transfer import save_batch
+from notes.wordlist import WORDS
+from yacommon.bulk import Progress, zipf_cum_weights
+
+# Варианты одного заголовка, которые pytils превращает в один slug.
+TITLE_VARIANTS = (
+    '{}', '{}!', '{}...', '{}?', '«{}»', '"{}"', '{}.', '{}!!!',
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями и заметками '
+        'для нагрузочных замеров: у нескольких авторов десятки тысяч '
+        'заметок, а популярные заголовки совпадают после транслитерации. '
+        'При одном и том же --seed данные совпадают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000)
+        parser.add_argument('--notes', type=int, default=1_000_000)
+        parser.add_argument(
+            '--heavy-users',
+            type=int,
+            default=5,
+            help='Сколько авторов получат по --heavy-notes заметок.'
+        )
+        parser.add_argument('--heavy-notes', type=int, default=50_000)
+        parser.add_argument(
+            '--titles',
+            type=int,
+            default=5_000,
+            help='Сколько разных заголовков, без учёта вариантов написания.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--progress-every',
+            type=float,
+            default=5.0,
+            help='Интервал отчёта о скорости, в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        heavy_total = options['heavy_users'] * options['heavy_notes']
+        if options['batch_size'] < 1 or options['titles'] < 1:
+            raise CommandError(
+                '--batch-size и --titles должны быть положительными.'
+            )
+        if heavy_total > options['notes'] or (
+            options['heavy_users'] > options['users']
+        ):
+            raise CommandError(
+                'Заметок и пользователей меньше, чем нужно активным авторам.'
+            )
+        if options['notes'] > heavy_total and (
+            options['users'] == options['heavy_users']
+        ):
+            raise CommandError(
+                'Для остальных заметок нужен хотя бы один обычный автор.'
+            )
+        self.username_prefix = f'seed{options["seed"]}_'
+        if User.objects.filter(
+            username__startswith=self.username_prefix
+        ).exists():
+            raise CommandError(
+                f'Пользователи {self.username_prefix}* уже созданы, '
+                'укажите другой --seed.'
+            )
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.created = 0
+        self.progress = Progress(self.stderr, options['progress_every'])
+        user_ids = self.create_users(options['users'])
+        self.create_notes(
+            self.assign_authors(user_ids, options),
+            self.make_titles(options['titles']),
+        )
+        elapsed = self.progress.elapsed()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {len(user_ids)} пользователей, '
+            f'{options["notes"]} заметок, {elapsed:.1f} с, '
+            f'{self.created / (elapsed or 1):.0f} строк/с'
+        ))
+
+    def sentence(self, min_words, max_words):
+        words = self.rng.choices(
+            WORDS, k=self.rng.randint(min_words, max_words)
+        )
+        return ' '.join(words).capitalize()
+
+    def create_users(self, count):
+        """Создаёт пользователей пачками и возвращает их pk."""
+        users = (
+            User(
+                username=f'{self.username_prefix}{index}',
+                password=UNUSABLE_PASSWORD_PREFIX,
+            )
+            for index in range(count)
+        )
+        while True:
+            batch = list(islice(users, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+            self.created += len(batch)
+            self.progress.report(self.created)
+        # SQLite не возвращает pk из bulk_create.
+        return list(User.objects.filter(
+            username__startswith=self.username_prefix
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def assign_authors(self, user_ids, options):
+        """
+        Авторы заметок по порядку вставки.
+
+        Первые --heavy-users авторов получают ровно по --heavy-notes
+        заметок, остальные заметки делятся между прочими по Ципфу.
+        """
+        heavy = user_ids[:options['heavy_users']]
+        regular = user_ids[options['heavy_users']:]
+        authors = [
+            author for author in heavy
+            for _ in range(options['heavy_notes'])
+        ]
+        rest = options['notes'] - len(authors)
+        if rest:
+            authors += self.rng.choices(
+                regular, cum_weights=zipf_cum_weights(len(regular)), k=rest
+            )
+        self.rng.shuffle(authors)
+        return authors
+
+    def make_titles(self, count):
+        """
+        Бесконечный поток заголовков: популярные повторяются чаще
+        и пишутся по-разному, но дают один и тот же slug.
+        """
+        titles = [self.sentence(1, 4) for _ in range(count)]
+        weights = zipf_cum_weights(count)
+        while True:
+            for title in self.rng.choices(
+                titles, cum_weights=weights, k=self.batch_size
+            ):
+                yield self.rng.choice(TITLE_VARIANTS).format(title)
+
+    def create_notes(self, authors, titles):
+        for start in range(0, len(authors), self.batch_size):
+            batch = [
+                Note(
+                    title=title,
+                    text=self.sentence(5, 40),
+                    author_id=author_id,
+                )
+                for author_id, title in zip(
+                    authors[start:start + self.batch_size], titles
+                )
+            ]
+            # Slug подбираются по заголовкам одним запросом на пачку.
+            save_batch(batch)
+            self.created += len(batch)
+            self.progress.report(self.created)
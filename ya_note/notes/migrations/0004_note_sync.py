@@ -0,0 +1,38 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0003_note_author_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note_id', models.BigIntegerField(verbose_name='Заметка')),
+                ('deleted', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Удалена')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['author', 'updated', 'id'], name='note_author_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='notetombstone',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notetombstone',
+            index=models.Index(fields=['author', 'deleted', 'id'], name='tombstone_author_deleted_idx'),
+        ),
+    ]
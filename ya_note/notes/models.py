@@ -1,7 +1,14 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, OperationalError, models, transaction
+from django.utils import timezone
 
-from pytils.translit import slugify
+from .slugs import allocate_slug
+
+# Поля, которые выводит список заметок; по id и updated строка
+# находится в кеше фрагментов.
+NOTE_LIST_FIELDS = ('id', 'slug', 'title', 'updated')
+# Сколько раз подбирать slug заново, если его успел занять другой запрос.
+SLUG_ATTEMPTS = 5
 
 
 class Note(models.Model):
@@ -27,12 +34,63 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated = models.DateTimeField('Изменена', auto_now=True)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+            models.Index(
+                fields=('author', 'updated', 'id'),
+                name='note_author_updated_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Подбирает свободный slug, если он не указан.
+
+        Проверки перед вставкой нет: при гонке за slug база отвечает
+        IntegrityError, и slug подбирается ещё раз.
+        """
+        if self.slug:
+            return super().save(*args, **kwargs)
+        max_slug_length = self._meta.get_field('slug').max_length
+        for attempt in range(1, SLUG_ATTEMPTS + 1):
+            self.slug = allocate_slug(
+                Note.objects.exclude(pk=self.pk), self.title, max_slug_length
+            )
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except OperationalError:
+                # Повторная запись (см. yacommon.db) подберёт slug заново.
+                self.slug = ''
+                raise
+            except IntegrityError:
+                self.slug = ''
+                if attempt == SLUG_ATTEMPTS:
+                    raise
+
+
+class NoteTombstone(models.Model):
+    """След удалённой заметки, по которому клиенты узнают об удалении."""
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    note_id = models.BigIntegerField('Заметка')
+    deleted = models.DateTimeField('Удалена', default=timezone.now)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'deleted', 'id'),
+                name='tombstone_author_deleted_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.note_id} ({self.deleted:%Y-%m-%d %H:%M})'
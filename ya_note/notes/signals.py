@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from yacommon.cache import get_fragment_cache
+
+from .cache import note_row_key
+from .models import Note, NoteTombstone
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    NoteTombstone.objects.create(
+        author_id=instance.author_id, note_id=instance.pk
+    )
+    # После правки ключ строки меняется сам, вместе с updated.
+    get_fragment_cache().delete(note_row_key(instance.pk, instance.updated))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def author_deleted(sender, instance, **kwargs):
+    """
+    Убирает следы заметок удалённого пользователя.
+
+    Заметки удаляются каскадом раньше пользователя и оставляют следы
+    со ссылкой на него; синхронизировать их уже некому.
+    """
+    NoteTombstone.objects.filter(author_id=instance.pk).delete()
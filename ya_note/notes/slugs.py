@@ -0,0 +1,123 @@
+import re
+from functools import lru_cache
+
+from django.db.models import Q
+from pytils.translit import slugify
+
+DEFAULT_SLUG: str = 'note'
+# Сколько последних заголовков помнит кеш транслитерации.
+SLUGIFY_CACHE_SIZE: int = 10_000
+# Сколько основ проверять одним запросом при пакетном подборе.
+BASES_PER_QUERY: int = 300
+# Сколько символов оставлять под суффикс -N: основа длиннее
+# max_length - SUFFIX_LENGTH обрезается перед добавлением номера.
+SUFFIX_LENGTH: int = 11
+
+
+@lru_cache(maxsize=SLUGIFY_CACHE_SIZE)
+def cached_slugify(title):
+    """
+    Транслитерирует заголовок в slug, запоминая результат.
+
+    Один и тот же заголовок за запрос или импорт обычно
+    транслитерируется несколько раз, а pytils делает это медленно.
+    """
+    return slugify(title)
+
+
+def slugify_cache_info():
+    """Статистика кеша транслитерации: hits, misses, maxsize, currsize."""
+    return cached_slugify.cache_info()
+
+
+def make_base(title, max_length):
+    return cached_slugify(title)[:max_length] or DEFAULT_SLUG
+
+
+def slug_range(base):
+    """
+    Условие на base и base-N.
+
+    Это два диапазона по уникальному индексу slug: в отличие от LIKE,
+    SQLite читает только подходящий кусок индекса.
+    """
+    return Q(slug=base) | Q(slug__gt=f'{base}-', slug__lt=f'{base}.')
+
+
+def make_stem(base, max_length):
+    """
+    Начало нумерованного slug: stem-N умещается в max_length.
+
+    Если бы длинная основа обрезалась уже вместе с номером, slug
+    не начинался бы с неё и не попадал бы в slug_range(base).
+    """
+    return base[:max_length - SUFFIX_LENGTH]
+
+
+def taken_range(base, max_length):
+    """Условие на slug, которые может занять заголовок с этой основой."""
+    return Q(slug=base) | slug_range(make_stem(base, max_length))
+
+
+def next_free_slug(base, taken, max_length):
+    """Возвращает base или stem-N, где N больше всех занятых суффиксов."""
+    if base not in taken:
+        return base
+    stem = make_stem(base, max_length)
+    suffix = re.compile(re.escape(stem) + r'-(\d+)')
+    numbers = [
+        int(match.group(1))
+        for match in map(suffix.fullmatch, taken) if match
+    ]
+    return f'{stem}-{max(numbers, default=1) + 1}'
+
+
+def allocate_slug(queryset, title, max_length):
+    """Подбирает свободный slug по заголовку одним запросом к индексу."""
+    base = make_base(title, max_length)
+    taken = set(queryset.filter(
+        taken_range(base, max_length)
+    ).values_list('slug', flat=True))
+    return next_free_slug(base, taken, max_length)
+
+
+def remember_suffix(numbers, slug):
+    """Учитывает slug вида stem-N в наибольших занятых номерах."""
+    stem, _, number = slug.rpartition('-')
+    if stem and number.isdigit():
+        numbers[stem] = max(numbers.get(stem, 1), int(number))
+
+
+def allocate_slugs(queryset, titles, max_length):
+    """
+    Подбирает slug для пачки заголовков, например при импорте.
+
+    Занятые slug читаются одним запросом на BASES_PER_QUERY основ,
+    совпадающие заголовки внутри пачки тоже получают разные slug.
+    Наибольший номер каждой основы считается один раз на пачку,
+    а не перебором всех занятых slug для каждого заголовка.
+    """
+    bases = [make_base(title, max_length) for title in titles]
+    unique_bases = list(dict.fromkeys(bases))
+    taken = set()
+    for start in range(0, len(unique_bases), BASES_PER_QUERY):
+        chunk = unique_bases[start:start + BASES_PER_QUERY]
+        # Q собирается сразу из всех условий: последовательное «|»
+        # сравнивает каждое новое условие со всеми предыдущими.
+        taken.update(queryset.filter(Q(
+            *(taken_range(base, max_length) for base in chunk),
+            _connector=Q.OR,
+        )).values_list('slug', flat=True))
+    numbers = {}
+    for slug in taken:
+        remember_suffix(numbers, slug)
+    slugs = []
+    for base in bases:
+        slug = base
+        if slug in taken:
+            stem = make_stem(base, max_length)
+            slug = f'{stem}-{numbers.get(stem, 1) + 1}'
+        taken.add(slug)
+        remember_suffix(numbers, slug)
+        slugs.append(slug)
+    return slugs
@@ -0,0 +1,70 @@
+from django.http import Http404
+
+from yacommon.pagination import (INVALID_CURSOR, encode_cursor,
+                                 paginate_keyset)
+
+from .models import Note, NoteTombstone
+
+# Поля заметки, которые получает клиент синхронизации.
+SYNC_NOTE_FIELDS = ('id', 'slug', 'title', 'text', 'updated')
+NOTES_KEYSET = ('updated', 'id')
+TOMBSTONES_KEYSET = ('deleted', 'id')
+# Разделитель курсоров двух потоков; в base64url его не бывает.
+STREAM_SEPARATOR: str = '.'
+
+
+def read_stream(queryset, fields, cursor, limit):
+    """
+    Читает из потока изменений не больше limit записей после курсора.
+
+    Возвращает записи, курсор последней из них и признак того,
+    что в потоке остались ещё записи.
+    """
+    page = paginate_keyset(queryset, fields, cursor, limit, descending=False)
+    if page.object_list:
+        cursor = encode_cursor(page.object_list[-1], fields)
+    return page.object_list, cursor, page.has_next
+
+
+def sync_notes(author, cursor, limit):
+    """
+    Отдаёт изменения заметок автора с момента, отмеченного курсором.
+
+    Курсор составной: позиция в заметках по (updated, id) и позиция
+    в следах удалений по (deleted, id). Оба потока читаются по индексу
+    с позиции курсора, так что цена синхронизации зависит от числа
+    изменений, а не от числа заметок. При первой синхронизации следы
+    удалений не нужны: курсор сразу ставится на последний из них.
+    """
+    tombstones = NoteTombstone.objects.filter(author=author)
+    if cursor:
+        try:
+            notes_cursor, tombstones_cursor = cursor.split(STREAM_SEPARATOR)
+        except ValueError:
+            raise Http404(INVALID_CURSOR)
+    else:
+        notes_cursor = tombstones_cursor = ''
+        last = tombstones.order_by(*(
+            f'-{field}' for field in TOMBSTONES_KEYSET
+        )).only(*TOMBSTONES_KEYSET).first()
+        if last is not None:
+            tombstones_cursor = encode_cursor(last, TOMBSTONES_KEYSET)
+    notes, notes_cursor, more_notes = read_stream(
+        Note.objects.filter(author=author).only(*SYNC_NOTE_FIELDS),
+        NOTES_KEYSET, notes_cursor, limit,
+    )
+    deleted, tombstones_cursor, more_deleted = read_stream(
+        tombstones.only(*TOMBSTONES_KEYSET, 'note_id'),
+        TOMBSTONES_KEYSET, tombstones_cursor, limit,
+    )
+    return {
+        'notes': [
+            {field: getattr(note, field) for field in SYNC_NOTE_FIELDS}
+            for note in notes
+        ],
+        'deleted': [tombstone.note_id for tombstone in deleted],
+        'cursor': STREAM_SEPARATOR.join(
+            (notes_cursor or '', tombstones_cursor or '')
+        ),
+        'has_more': more_notes or more_deleted,
+    }
@@ -1,14 +1,23 @@
+from http import HTTPStatus
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from notes.cache import note_row_key
 from notes.models import Note
+from yacommon.cache import FRAGMENT_CACHE_ALIAS, get_fragment_cache
+from yacommon.metrics import registry
 
 NOTE_TITLE: str = 'Заголовок новости'
 NOTE_TEXT: str = 'Текст новости'
 NOTE_SLUG: str = 'test'
 NOTE_AUTHOR_TEXT: str = 'Автор'
 NOTE_READER_TEXT: str = 'Читатель'
+PASSWORD: str = 'Пароль автора'
 NOTES_COUNT: int = 10
 
 User = get_user_model()
@@ -60,6 +69,147 @@ class TestNotesListPage(TestCase):
         self.assertFalse(author_notes.intersection(reader_notes))
 
 
+class TestNotesListPagination(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        Note.objects.bulk_create(
+            Note(
+                title=f'{NOTE_TITLE} {index}',
+                text=NOTE_TEXT,
+                slug=f'{NOTE_SLUG}{index}',
+                author=cls.author
+            )
+            for index in range(NOTES_COUNT)
+        )
+        cls.url = reverse('notes:list')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def get_page(self, cursor=None):
+        response = self.client.get(
+            self.url, {'cursor': cursor} if cursor else None
+        )
+        return response.context['page_obj']
+
+    def test_pages_cover_all_notes(self):
+        """Verifies that list pages show every note once, newest first"""
+        with self.settings(NOTES_COUNT_ON_LIST_PAGE=3):
+            page = self.get_page()
+            seen = list(page)
+            while page.has_next:
+                page = self.get_page(page.next_cursor)
+                seen.extend(page)
+        self.assertEqual(
+            [note.pk for note in seen],
+            list(Note.objects.order_by('-pk').values_list('pk', flat=True))
+        )
+
+    def test_deep_page_costs_as_first(self):
+        """Verifies that a deep page runs the same queries as the first"""
+        with self.settings(NOTES_COUNT_ON_LIST_PAGE=2):
+            with CaptureQueriesContext(connection) as first_page:
+                page = self.get_page()
+            for _ in range(3):
+                page = self.get_page(page.next_cursor)
+            with CaptureQueriesContext(connection) as deep_page:
+                self.get_page(page.next_cursor)
+        self.assertEqual(len(deep_page), len(first_page))
+
+    def test_note_text_is_not_loaded(self):
+        """Verifies that the list page does not load the note text"""
+        for note in self.get_page():
+            self.assertIn('text', note.get_deferred_fields())
+
+
+class TestNoteSync(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        cls.reader = User.objects.create(username=NOTE_READER_TEXT)
+        Note.objects.bulk_create(
+            Note(
+                title=f'{NOTE_TITLE} {index}',
+                text=NOTE_TEXT,
+                slug=f'{NOTE_SLUG}{index}',
+                author=cls.author
+            )
+            for index in range(NOTES_COUNT)
+        )
+        cls.url = reverse('notes:sync')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def sync(self, cursor=''):
+        return self.client.get(self.url, {'cursor': cursor}).json()
+
+    def sync_all(self, cursor=''):
+        notes, deleted = [], []
+        while True:
+            batch = self.sync(cursor)
+            notes.extend(note['id'] for note in batch['notes'])
+            deleted.extend(batch['deleted'])
+            cursor = batch['cursor']
+            if not batch['has_more']:
+                return notes, deleted, cursor
+
+    def test_initial_sync_in_batches(self):
+        """Verifies that a first sync returns every note in bounded batches"""
+        Note.objects.first().delete()
+        with self.settings(NOTES_SYNC_BATCH_SIZE=3):
+            self.assertEqual(len(self.sync()['notes']), 3)
+            notes, deleted, _ = self.sync_all()
+        self.assertEqual(
+            sorted(notes),
+            list(Note.objects.order_by('pk').values_list('pk', flat=True))
+        )
+        self.assertEqual(deleted, [])
+
+    def test_sync_returns_only_changes(self):
+        """Verifies that a sync from a cursor sees edits and deletions"""
+        _, _, cursor = self.sync_all()
+        edited, removed = Note.objects.all()[:2]
+        removed_pk = removed.pk
+        edited.title = NOTE_TITLE
+        edited.save()
+        removed.delete()
+        Note.objects.create(
+            title=NOTE_TITLE, text=NOTE_TEXT, author=self.reader
+        )
+        notes, deleted, cursor = self.sync_all(cursor)
+        self.assertEqual(notes, [edited.pk])
+        self.assertEqual(deleted, [removed_pk])
+        self.assertEqual(self.sync(cursor)['notes'], [])
+
+    def test_sync_costs_do_not_depend_on_library_size(self):
+        """Verifies that an empty sync runs a fixed number of queries"""
+        _, _, cursor = self.sync_all()
+        with CaptureQueriesContext(connection) as small:
+            self.sync(cursor)
+        Note.objects.bulk_create(
+            Note(
+                title=NOTE_TITLE,
+                text=NOTE_TEXT,
+                slug=f'{NOTE_SLUG}-more-{index}',
+                author=self.author
+            )
+            for index in range(NOTES_COUNT * 10)
+        )
+        _, _, cursor = self.sync_all(cursor)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.sync(cursor)['notes'], [])
+        self.assertEqual(len(small), len(large))
+
+    def test_broken_cursor(self):
+        """Verifies that a malformed sync cursor returns 404"""
+        response = self.client.get(self.url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
 class TestNotesAddAndEdit(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -86,3 +236,188 @@ class TestNotesAddAndEdit(TestCase):
                 url = reverse(name, args=args)
                 response = self.client.get(url)
                 self.assertIn('form', response.context)
+
+
+class TestConditionalGet(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        cls.reader = User.objects.create(username=NOTE_READER_TEXT)
+        cls.note = Note.objects.create(
+            title=NOTE_TITLE,
+            text=NOTE_TEXT,
+            slug=NOTE_SLUG,
+            author=cls.author
+        )
+        cls.urls = (
+            reverse('notes:list'),
+            reverse('notes:detail', args=(cls.note.slug,)),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_matching_etag_returns_not_modified(self):
+        """Verifies that a matching If-None-Match is answered with 304"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertFalse(response.templates)
+
+    def test_detail_if_modified_since(self):
+        """Verifies that the note detail page honours If-Modified-Since"""
+        url = reverse('notes:detail', args=(self.note.slug,))
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_changes_after_edit(self):
+        """Verifies that editing a note changes the ETags of its pages"""
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        self.note.title = NOTE_TITLE + '!'
+        self.note.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_list_etag_changes_after_delete(self):
+        """Verifies that deleting a note changes the notes list ETag"""
+        url = reverse('notes:list')
+        etag = self.client.get(url)['ETag']
+        Note.objects.filter(pk=self.note.pk).delete()
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_etag_changes_after_login(self):
+        """
+        Verifies that logging in again changes the ETags, so the pages
+        are re-rendered with the rotated CSRF token
+        """
+        self.author.set_password(PASSWORD)
+        self.author.save()
+        credentials = {'username': self.author.username, 'password': PASSWORD}
+        self.client.post(reverse('users:login'), credentials)
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        self.client.get(reverse('users:logout'))
+        self.client.post(reverse('users:login'), credentials)
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_differs_between_users(self):
+        """Verifies that the notes list ETag depends on the user"""
+        url = reverse('notes:list')
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+
+class TestNoteRowFragments(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        cls.note = Note.objects.create(
+            title=NOTE_TITLE,
+            text=NOTE_TEXT,
+            slug=NOTE_SLUG,
+            author=cls.author
+        )
+        cls.url = reverse('notes:list')
+
+    def setUp(self):
+        get_fragment_cache().clear()
+        self.client.force_login(self.author)
+
+    def test_rows_follow_edit_time(self):
+        """Verifies that a cached list row is replaced once the note changes"""
+        self.client.get(self.url)
+        key = note_row_key(self.note.pk, self.note.updated)
+        self.assertIsNotNone(get_fragment_cache().get(key))
+        # The row comes from the cache while updated stays the same.
+        Note.objects.filter(pk=self.note.pk).update(title=NOTE_TITLE + '?')
+        self.assertNotContains(self.client.get(self.url), NOTE_TITLE + '?')
+        self.note.title = NOTE_TITLE + '!'
+        self.note.save()
+        self.assertContains(self.client.get(self.url), self.note.title)
+
+    def test_rows_are_kept_apart_from_default_cache(self):
+        """Verifies that list rows are stored in the fragment cache"""
+        self.client.get(self.url)
+        key = note_row_key(self.note.pk, self.note.updated)
+        self.assertIsNotNone(caches[FRAGMENT_CACHE_ALIAS].get(key))
+        self.assertIsNone(caches['default'].get(key))
+
+    def test_row_is_dropped_with_note(self):
+        """Verifies that deleting a note removes its cached list row"""
+        self.client.get(self.url)
+        key = note_row_key(self.note.pk, self.note.updated)
+        self.note.delete()
+        self.assertIsNone(get_fragment_cache().get(key))
+
+
+class TestMetrics(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        cls.note = Note.objects.create(
+            title=NOTE_TITLE, text=NOTE_TEXT, slug=NOTE_SLUG, author=cls.author
+        )
+
+    def setUp(self):
+        registry.clear()
+        self.client.force_login(self.author)
+
+    @override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_SERVER_TIMING=True)
+    def test_metrics_are_recorded_per_view(self):
+        """Verifies that request metrics are exported per URL name"""
+        response = self.client.get(reverse('notes:list'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.client.get(reverse('notes:detail', args=(self.note.slug,)))
+        content = self.client.get(reverse('metrics')).content.decode()
+        for view in ('notes:list', 'notes:detail'):
+            with self.subTest(view=view):
+                self.assertIn(
+                    f'http_request_template_render_seconds_count'
+                    f'{{view="{view}"}} 1',
+                    content,
+                )
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_sampling_off_records_nothing(self):
+        """Verifies that with sampling off requests are not measured"""
+        self.client.get(reverse('notes:list'))
+        self.assertFalse(registry.histograms)
+
+
+class TestSlowQueryLog(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        Note.objects.create(
+            title=NOTE_TITLE, text=NOTE_TEXT, slug=NOTE_SLUG, author=cls.author
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_list_queries_are_logged_with_plan(self):
+        """Verifies that list queries are logged with an index-only plan"""
+        self.client.force_login(self.author)
+        with self.assertLogs('yacommon.querylog') as logs:
+            self.client.get(reverse('notes:list'))
+        list_queries = [
+            message for message in logs.output
+            if 'FROM "notes_note" WHERE' in message
+            and 'in notes:list at notes/' in message
+        ]
+        self.assertTrue(list_queries)
+        for message in list_queries:
+            self.assertIn('SEARCH notes_note USING INDEX', message)
+            self.assertNotIn('USE TEMP B-TREE', message)
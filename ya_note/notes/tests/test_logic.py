@@ -1,10 +1,30 @@
+import io
+import json
+import sqlite3
+import threading
+import zipfile
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytils.translit import slugify
 
-from notes.forms import WARNING
+from notes.forms import IMPORT_FORMAT_ERROR, WARNING
 from notes.models import Note
+from notes.slugs import (allocate_slug, allocate_slugs, cached_slugify,
+                         slugify_cache_info)
+from notes.transfer import save_batch
+from yacommon import db
+from yacommon.benchmark import RequestSpec, login_cookies, run_requests
 
 NOTE_TITLE: str = 'Заголовок заметки'
 NOTE_TEXT: str = 'Текст заметки'
@@ -17,6 +37,8 @@ NOTE_READER_TEXT: str = 'Читатель'
 NOTE_DEFAULT_USER_TEXT: str = 'Пользователь'
 EXPECTED_OPERATION_SUCCESS: int = 1
 EXPECTED_OPERATION_FAILURE: int = 0
+# How long another connection keeps the notes table locked, seconds.
+FOREIGN_LOCK_SECONDS: float = 0.05
 
 
 User = get_user_model()
@@ -83,6 +105,315 @@ class TestNoteCreation(TestCase):
         self.assertEqual(new_note.slug, expected_slug)
 
 
+class TestSlugAllocation(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username=NOTE_DEFAULT_USER_TEXT)
+        cls.max_length = Note._meta.get_field('slug').max_length
+
+    def create_note(self, **kwargs):
+        return Note.objects.create(
+            title=NOTE_TITLE, text=NOTE_TEXT, author=self.user, **kwargs
+        )
+
+    def test_same_titles_get_numbered_slugs(self):
+        """Verifies that notes with the same title get -2, -3 suffixes"""
+        base = slugify(NOTE_TITLE)
+        slugs = [self.create_note().slug for _ in range(3)]
+        self.assertEqual(slugs, [base, f'{base}-2', f'{base}-3'])
+
+    def test_suffix_follows_the_largest_taken(self):
+        """Verifies that the next suffix is above the largest taken one"""
+        base = slugify(NOTE_TITLE)
+        self.create_note(slug=base)
+        self.create_note(slug=f'{base}-7')
+        self.create_note(slug=f'{base}x')
+        self.assertEqual(self.create_note().slug, f'{base}-8')
+
+    def test_long_titles_get_numbered_slugs(self):
+        """Verifies that titles longer than the slug still get -N suffixes"""
+        title = 'Щ' * self.max_length
+        slugs = [
+            Note.objects.create(
+                title=title, text=NOTE_TEXT, author=self.user
+            ).slug
+            for _ in range(4)
+        ]
+        self.assertEqual(len(set(slugs)), len(slugs))
+        self.assertTrue(all(len(slug) <= self.max_length for slug in slugs))
+        self.assertEqual(slugs[3], f'{slugs[1][:-2]}-4')
+
+    def test_slug_is_allocated_with_one_query(self):
+        """Verifies that a free slug is found with a single query"""
+        self.create_note()
+        with self.assertNumQueries(1):
+            allocate_slug(Note.objects.all(), NOTE_TITLE, self.max_length)
+
+    def test_batch_allocation(self):
+        """Verifies that a batch of titles gets distinct slugs at once"""
+        self.create_note()
+        base = slugify(NOTE_TITLE)
+        titles = [NOTE_TITLE, NEW_NOTE_TITLE, NOTE_TITLE]
+        with CaptureQueriesContext(connection) as queries:
+            slugs = allocate_slugs(Note.objects.all(), titles, self.max_length)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            slugs, [f'{base}-2', slugify(NEW_NOTE_TITLE), f'{base}-3']
+        )
+
+    def test_truncated_slugs_stay_unique(self):
+        """Verifies that bases cut to the same slug still get distinct ones"""
+        titles = ['a' * self.max_length, 'a' * (self.max_length - 1) + 'b']
+        slugs = allocate_slugs(
+            Note.objects.all(), titles * 2, self.max_length
+        )
+        self.assertEqual(len(set(slugs)), len(slugs))
+        self.assertTrue(all(len(slug) <= self.max_length for slug in slugs))
+
+    def test_long_titles_in_separate_batches(self):
+        """Verifies that batches see numbered slugs of earlier long titles"""
+        title = 'Щ' * self.max_length
+        for _ in range(4):
+            save_batch([Note(title=title, text=NOTE_TEXT, author=self.user)])
+        slugs = list(Note.objects.values_list('slug', flat=True))
+        self.assertEqual(len(set(slugs)), 4)
+        self.assertTrue(all(len(slug) <= self.max_length for slug in slugs))
+
+    def test_slug_race_is_retried(self):
+        """Verifies that a slug taken by a concurrent writer is retried"""
+        taken = self.create_note().slug
+        with mock.patch(
+            'notes.models.allocate_slug',
+            side_effect=[taken, f'{taken}-2'],
+        ):
+            note = self.create_note()
+        self.assertEqual(note.slug, f'{taken}-2')
+
+    def test_form_does_not_check_slug_before_insert(self):
+        """Verifies that creating a note with a slug skips the exists()"""
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('notes:add'), data={
+                'title': NOTE_TITLE, 'text': NOTE_TEXT, 'slug': NOTE_SLUG,
+            })
+        self.assertFalse([
+            query for query in queries
+            if query['sql'].startswith('SELECT')
+            and 'notes_note' in query['sql']
+        ])
+        self.assertEqual(Note.objects.get().slug, NOTE_SLUG)
+
+    def test_cached_slugify_matches_pytils(self):
+        """Verifies that the cached slugify agrees with pytils and hits"""
+        cached_slugify.cache_clear()
+        titles = [NOTE_TITLE, 'Ёлка и щенок', NOTE_TITLE, '']
+        self.assertEqual(
+            [cached_slugify(title) for title in titles],
+            [slugify(title) for title in titles],
+        )
+        info = slugify_cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 3))
+
+
+class TestNoteExportImport(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        cls.reader = User.objects.create(username=NOTE_READER_TEXT)
+        for index in range(3):
+            Note.objects.create(
+                title=f'{NOTE_TITLE} {index}',
+                text=f'{NOTE_TEXT}\n\nабзац {index}',
+                author=cls.author,
+            )
+        Note.objects.create(
+            title=NOTE_TITLE, text=NOTE_TEXT, author=cls.reader
+        )
+        cls.export_url = reverse('notes:export')
+        cls.import_url = reverse('notes:import')
+
+    def export(self, export_format):
+        self.client.force_login(self.author)
+        response = self.client.get(self.export_url, {'format': export_format})
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def upload(self, user, name, content):
+        self.client.force_login(user)
+        return self.post_file(name, content)
+
+    def post_file(self, name, content):
+        return self.client.post(self.import_url, {
+            'file': SimpleUploadedFile(name, content)
+        })
+
+    def assert_copied_to_reader(self):
+        author_notes = Note.objects.filter(author=self.author)
+        reader_notes = Note.objects.filter(author=self.reader)
+        self.assertEqual(
+            sorted(author_notes.values_list('title', 'text')),
+            sorted(reader_notes.exclude(title=NOTE_TITLE).values_list(
+                'title', 'text'
+            )),
+        )
+        self.assertFalse(
+            set(author_notes.values_list('slug', flat=True))
+            & set(reader_notes.values_list('slug', flat=True))
+        )
+
+    def test_export_jsonl_has_only_own_notes(self):
+        """Verifies that the JSONL export streams every own note"""
+        records = [
+            json.loads(line) for line in self.export('jsonl').splitlines()
+        ]
+        self.assertEqual(
+            [record['slug'] for record in records],
+            list(Note.objects.filter(author=self.author).order_by(
+                'id'
+            ).values_list('slug', flat=True)),
+        )
+
+    def test_jsonl_round_trip(self):
+        """Verifies that an exported JSONL file imports with new slugs"""
+        response = self.upload(
+            self.reader, 'notes.jsonl', self.export('jsonl')
+        )
+        self.assertRedirects(response, reverse('notes:success'))
+        self.assert_copied_to_reader()
+
+    def test_markdown_zip_round_trip(self):
+        """Verifies that an exported Markdown archive imports back"""
+        content = self.export('markdown')
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(len(archive.namelist()), 3)
+        self.upload(self.reader, 'notes.zip', content)
+        self.assert_copied_to_reader()
+
+    @override_settings(NOTES_IMPORT_MAX_ENTRY_SIZE=1000)
+    def test_oversized_archive_entries_are_skipped(self):
+        """Verifies that a zip entry over the size limit is not imported"""
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('big.md', '# Большая\n' + 'а' * 1000)
+            archive.writestr('small.md', f'# {NEW_NOTE_TITLE}\n{NOTE_TEXT}')
+        self.upload(self.reader, 'notes.zip', content.getvalue())
+        titles = set(Note.objects.filter(
+            author=self.reader
+        ).values_list('title', flat=True))
+        self.assertEqual(titles, {NOTE_TITLE, NEW_NOTE_TITLE})
+
+    def test_broken_records_are_skipped(self):
+        """Verifies that invalid lines do not stop the import"""
+        lines = [
+            json.dumps({'title': NEW_NOTE_TITLE, 'text': NEW_NOTE_TEXT}),
+            '{broken',
+            json.dumps({'title': NEW_NOTE_TITLE}),
+            json.dumps({'text': NEW_NOTE_TEXT, 'slug': 'не slug'}),
+            json.dumps([NEW_NOTE_TITLE]),
+        ]
+        self.upload(self.reader, 'notes.jsonl', '\n'.join(lines).encode())
+        self.assertEqual(
+            Note.objects.filter(title=NEW_NOTE_TITLE).count(), 1
+        )
+
+    def test_wrong_file_is_rejected(self):
+        """Verifies that a file of an unknown format is not imported"""
+        notes_count = Note.objects.count()
+        response = self.upload(self.reader, 'notes.zip', b'not a zip')
+        self.assertFormError(response, 'form', 'file', IMPORT_FORMAT_ERROR)
+        self.assertEqual(Note.objects.count(), notes_count)
+
+    def test_import_queries_do_not_grow_with_file(self):
+        """Verifies that a batch costs the same number of queries"""
+        def import_queries(count):
+            content = '\n'.join(
+                json.dumps({'title': NEW_NOTE_TITLE, 'text': NEW_NOTE_TEXT})
+                for _ in range(count)
+            ).encode()
+            with CaptureQueriesContext(connection) as queries:
+                self.post_file('notes.jsonl', content)
+            return len(queries)
+
+        self.client.force_login(self.reader)
+        self.assertEqual(import_queries(2), import_queries(20))
+
+
+class TestSeedNotes(TestCase):
+    options = {
+        'users': 3,
+        'notes': 40,
+        'heavy_users': 1,
+        'heavy_notes': 20,
+        'titles': 3,
+        'batch_size': 7,
+    }
+
+    def seed(self, **options):
+        call_command(
+            'seed_notes', stdout=io.StringIO(), **self.options, **options
+        )
+        return list(Note.objects.order_by('id').values_list(
+            'author__username', 'title', 'text', 'slug'
+        ))
+
+    def test_seed_is_skewed_and_collides(self):
+        """Verifies the heavy author and titles that share a slug base"""
+        notes = self.seed()
+        self.assertEqual(len(notes), self.options['notes'])
+        authors = [author for author, *_ in notes]
+        self.assertEqual(
+            max(map(authors.count, authors)), self.options['heavy_notes']
+        )
+        titles = {title for _, title, _, _ in notes}
+        bases = {cached_slugify(title) for title in titles}
+        self.assertLess(len(bases), len(titles))
+
+    def test_seed_is_repeatable(self):
+        """Verifies that the same seed produces the same notes"""
+        notes = self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        User.objects.all().delete()
+        self.assertEqual(self.seed(), notes)
+
+
+class TestBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        cls.note = Note.objects.create(
+            title=NOTE_TITLE, text=NOTE_TEXT, slug=NOTE_SLUG, author=cls.author
+        )
+
+    def test_benchmark_drives_wsgi_application(self):
+        """Verifies that benchmark requests pass session and CSRF checks"""
+        cookies, token = login_cookies(self.author)
+        specs = [
+            RequestSpec('GET', reverse('notes:list'), cookies=cookies),
+            RequestSpec(
+                'POST',
+                reverse('notes:edit', args=(NOTE_SLUG,)),
+                {
+                    'title': NEW_NOTE_TITLE,
+                    'text': NEW_NOTE_TEXT,
+                    'slug': NOTE_SLUG,
+                    'csrfmiddlewaretoken': token,
+                },
+                cookies,
+                HTTPStatus.FOUND,
+            ),
+        ]
+        latencies, errors, _, _ = run_requests(
+            'yanote.wsgi.application', specs, warmup=0
+        )
+        self.assertEqual((len(latencies), errors), (2, 0))
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, NEW_NOTE_TITLE)
+
+
 class TestCommentEditDelete(TestCase):
 
     @classmethod
@@ -127,3 +458,62 @@ class TestCommentEditDelete(TestCase):
                 self.client.post(self.edit_url, data=self.form_data)
                 self.note.refresh_from_db()
                 self.assertEqual(self.note.text, expected_result)
+
+
+class TestSqliteProfile(TestCase):
+
+    def test_sqlite_pragmas_are_applied(self):
+        """Verifies that new connections get the configured SQLite pragmas"""
+        for pragma in ('busy_timeout', 'cache_size'):
+            with self.subTest(pragma=pragma), connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA {pragma}')
+                self.assertEqual(
+                    cursor.fetchone()[0], settings.SQLITE_PRAGMAS[pragma]
+                )
+
+
+class TestLockedDatabase(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username=NOTE_DEFAULT_USER_TEXT)
+        self.client.force_login(self.user)
+
+    def test_note_creation_waits_for_locked_database(self):
+        """Verifies that a note is saved once a foreign write lock is gone"""
+        foreign = sqlite3.connect(
+            **connection.get_connection_params(), isolation_level=None
+        )
+        foreign.execute('BEGIN IMMEDIATE')
+        foreign.execute('DELETE FROM notes_note')
+        release = threading.Timer(
+            FOREIGN_LOCK_SECONDS, foreign.execute, args=('COMMIT',)
+        )
+        retries = db.stats.retries
+        release.start()
+        with self.settings(SQLITE_WRITE_ATTEMPTS=10):
+            response = self.client.post(reverse('notes:add'), data={
+                'title': NOTE_TITLE, 'text': NOTE_TEXT,
+            })
+        release.join()
+        foreign.close()
+        self.assertRedirects(response, reverse('notes:success'))
+        self.assertEqual(Note.objects.count(), EXPECTED_OPERATION_SUCCESS)
+        self.assertGreater(db.stats.retries, retries)
+        content = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(f'db_write_retries_total {db.stats.retries}', content)
+
+    def test_write_counters_are_exported(self):
+        """Verifies that write lock counters are exported with metrics"""
+        writes = db.stats.writes
+        self.client.post(reverse('notes:add'), data={
+            'title': NOTE_TITLE, 'text': NOTE_TEXT,
+        })
+        content = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(f'db_writes_total {writes + 1}', content)
+        for metric in (
+            'db_write_lock_wait_seconds_total',
+            'db_write_lock_max_wait_seconds',
+            'db_write_failures_total',
+        ):
+            with self.subTest(metric=metric):
+                self.assertIn(f'\n{metric} ', content)
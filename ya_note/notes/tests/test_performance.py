@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from notes.models import Note
+from yacommon.testing import capture_queries, full_scans
+
+NOTE_TITLE: str = 'Заголовок заметки'
+NOTE_TEXT: str = 'Текст заметки'
+NOTE_SLUG: str = 'test'
+NOTE_AUTHOR_TEXT: str = 'Автор'
+NOTE_READER_TEXT: str = 'Читатель'
+# Route name, whether the URL takes the note slug, exact number of
+# queries. Logged-in requests spend two queries on the session and user.
+ROUTE_BUDGETS = (
+    ('notes:home', False, 2),
+    ('notes:list', False, 4),
+    ('notes:detail', True, 4),
+    ('notes:edit', True, 3),
+    ('notes:delete', True, 3),
+    ('notes:add', False, 2),
+    ('notes:success', False, 2),
+    ('notes:sync', False, 5),
+    ('notes:export', False, 3),
+    ('notes:import', False, 2),
+)
+
+User = get_user_model()
+
+
+class QueryBudgetMixin:
+    """
+    Route query budgets for an author with notes_count notes.
+
+    The reader's notes and the author's deleted notes are there so that
+    the queries have something to filter out.
+    """
+    notes_count = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username=NOTE_AUTHOR_TEXT)
+        cls.reader = User.objects.create(username=NOTE_READER_TEXT)
+        Note.objects.bulk_create(
+            Note(
+                title=f'{NOTE_TITLE} {index}',
+                text=NOTE_TEXT,
+                slug=f'{owner.pk}-{index}',
+                author=owner,
+            )
+            for owner in (cls.author, cls.reader)
+            for index in range(cls.notes_count + 1)
+        )
+        # Deleting through the model leaves tombstones for the sync.
+        Note.objects.get(
+            author=cls.author, slug=f'{cls.author.pk}-0'
+        ).delete()
+        cls.note = Note.objects.create(
+            title=NOTE_TITLE,
+            text=NOTE_TEXT,
+            slug=NOTE_SLUG,
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_route_query_budgets(self):
+        """
+        Verifies that every route runs an exact number of queries whatever
+        the number of notes, and that none of them scans a whole table
+        """
+        for name, by_slug, budget in ROUTE_BUDGETS:
+            with self.subTest(name=name):
+                url = reverse(
+                    name, args=(self.note.slug,) if by_slug else None
+                )
+                response, queries = capture_queries(self.client, url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(len(queries), budget)
+                for sql, params in queries:
+                    self.assertEqual(full_scans(sql, params), [], sql)
+
+
+class TestQueryBudgetsSmall(QueryBudgetMixin, TestCase):
+    notes_count = 1
+
+
+class TestQueryBudgetsLarge(QueryBudgetMixin, TestCase):
+    notes_count = settings.NOTES_COUNT_ON_LIST_PAGE * 3
@@ -39,6 +39,9 @@ class TestRoutes(TestCase):
             ('notes:list', None),
             ('notes:success', None),
             ('notes:add', None),
+            ('notes:sync', None),
+            ('notes:export', None),
+            ('notes:import', None),
         )
         for name, args in urls:
             with self.subTest(name=name):
@@ -75,6 +78,9 @@ class TestRoutes(TestCase):
             ('notes:list', None),
             ('notes:success', None),
             ('notes:add', None),
+            ('notes:sync', None),
+            ('notes:export', None),
+            ('notes:import', None),
             ('notes:detail', slug),
             ('notes:delete', slug),
             ('notes:edit', slug)
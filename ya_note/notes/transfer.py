@@ -0,0 +1,189 @@
+import json
+import zipfile
+from itertools import islice
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import SLUG_ATTEMPTS, Note
+from .slugs import allocate_slugs
+
+# Поля заметки, которые переносятся при выгрузке и загрузке.
+TRANSFER_FIELDS = ('slug', 'title', 'text')
+MARKDOWN_HEADING: str = '# '
+
+
+def export_jsonl(notes):
+    """Выгружает заметки в JSONL, по строке на заметку."""
+    for note in notes:
+        yield json.dumps(
+            {field: getattr(note, field) for field in TRANSFER_FIELDS},
+            ensure_ascii=False,
+        ) + '\n'
+
+
+class ZipStream:
+    """Приёмник для zipfile, из которого записанное забирается порциями."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def export_markdown_zip(notes):
+    """
+    Выгружает заметки в zip-архив с файлом Markdown на заметку.
+
+    Архив пишется в поток без перемотки, поэтому в памяти
+    держится только текущая заметка.
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for note in notes:
+            info = zipfile.ZipInfo(
+                f'{note.slug}.md', date_time=note.updated.timetuple()[:6]
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(
+                info, f'{MARKDOWN_HEADING}{note.title}\n\n{note.text}\n'
+            )
+            yield stream.pop()
+    yield stream.pop()
+
+
+# Формат: функция выгрузки, тип содержимого, расширение файла.
+EXPORT_FORMATS = {
+    'jsonl': (export_jsonl, 'application/x-ndjson', 'jsonl'),
+    'markdown': (export_markdown_zip, 'application/zip', 'zip'),
+}
+
+
+def read_jsonl(upload):
+    """Читает записи из JSONL; вместо испорченных строк отдаёт None."""
+    for line in upload:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def read_entry(archive, info, limit):
+    """
+    Текст файла архива; None, если он больше limit байт или не UTF-8.
+
+    Размеру из заголовка можно не поверить, поэтому распаковка
+    в любом случае останавливается после limit байт.
+    """
+    if info.file_size > limit:
+        return None
+    with archive.open(info) as entry:
+        data = entry.read(limit + 1)
+    if len(data) > limit:
+        return None
+    try:
+        return data.decode()
+    except UnicodeDecodeError:
+        return None
+
+
+def read_markdown_zip(upload):
+    """
+    Читает записи из zip-архива, созданного export_markdown_zip.
+
+    Файлы больше NOTES_IMPORT_MAX_ENTRY_SIZE пропускаются,
+    не распаковываясь в память.
+    """
+    limit = settings.NOTES_IMPORT_MAX_ENTRY_SIZE
+    with zipfile.ZipFile(upload) as archive:
+        for info in archive.infolist():
+            path = PurePosixPath(info.filename)
+            if info.is_dir() or path.suffix != '.md':
+                continue
+            content = read_entry(archive, info, limit)
+            if content is None:
+                yield None
+                continue
+            heading, _, text = content.partition('\n')
+            if heading.startswith(MARKDOWN_HEADING):
+                title = heading[len(MARKDOWN_HEADING):].strip()
+            else:
+                title, text = path.stem, content
+            yield {'slug': path.stem, 'title': title, 'text': text.strip()}
+
+
+IMPORT_READERS = {
+    '.jsonl': read_jsonl,
+    '.zip': read_markdown_zip,
+}
+
+
+def build_note(author, record):
+    """Проверяет запись и собирает из неё заметку, либо возвращает None."""
+    if record is None:
+        return None
+    note = Note(author=author, **{
+        field: record[field] for field in TRANSFER_FIELDS if field in record
+    })
+    try:
+        note.full_clean(exclude=('author',), validate_unique=False)
+    except ValidationError:
+        return None
+    return note
+
+
+def save_batch(notes):
+    """
+    Сохраняет пачку заметок одним bulk_create.
+
+    Заданный slug сохраняется, если свободен, иначе, как и пустой,
+    подбирается по заголовку одним запросом на пачку.
+    """
+    max_slug_length = Note._meta.get_field('slug').max_length
+    wanted = [note.slug or note.title for note in notes]
+    for attempt in range(1, SLUG_ATTEMPTS + 1):
+        slugs = allocate_slugs(Note.objects.all(), wanted, max_slug_length)
+        for note, slug in zip(notes, slugs):
+            note.slug = slug
+        try:
+            with transaction.atomic():
+                return Note.objects.bulk_create(notes)
+        except IntegrityError:
+            if attempt == SLUG_ATTEMPTS:
+                raise
+
+
+def import_notes(author, records, batch_size):
+    """
+    Загружает заметки автора пачками по batch_size записей.
+
+    Возвращает число загруженных и пропущенных записей.
+    """
+    imported = skipped = 0
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return imported, skipped
+        notes = [
+            note for note in (build_note(author, record) for record in batch)
+            if note is not None
+        ]
+        skipped += len(batch) - len(notes)
+        if notes:
+            save_batch(notes)
+            imported += len(notes)
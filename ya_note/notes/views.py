@@ -1,9 +1,21 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
 
-from .forms import NoteForm
-from .models import Note
+from yacommon.db import serialized_write
+from yacommon.pagination import KeysetPaginationMixin
+
+from .conditional import (note_detail_etag, note_detail_last_modified,
+                          notes_list_etag)
+from .forms import WARNING, NoteForm, NoteImportForm
+from .models import NOTE_LIST_FIELDS, Note
+from .sync import sync_notes
+from .transfer import EXPORT_FORMATS, TRANSFER_FIELDS, import_notes
 
 
 class Home(generic.TemplateView):
@@ -26,22 +38,31 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormMixin:
+    """Сохраняет заметку, превращая конфликт slug в ошибку формы."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
+    @serialized_write
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except IntegrityError:
+            form.add_error('slug', form.instance.slug + WARNING)
+            return self.form_invalid(form)
+
+
+class NoteCreate(NoteBase, NoteFormMixin, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, NoteFormMixin, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -49,11 +70,79 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+@method_decorator(condition(etag_func=notes_list_etag), name='get')
+class NotesList(KeysetPaginationMixin, NoteBase, generic.ListView):
+    """
+    Список всех заметок пользователя, новые сверху.
+
+    Страницы листаются курсором по индексу (author, id),
+    текст заметок не загружается.
+    """
     template_name = 'notes/list.html'
 
+    def get_queryset(self):
+        return super().get_queryset().only(*NOTE_LIST_FIELDS)
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_COUNT_ON_LIST_PAGE
 
+
+@method_decorator(
+    condition(
+        etag_func=note_detail_etag,
+        last_modified_func=note_detail_last_modified,
+    ),
+    name='get'
+)
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class NoteSync(LoginRequiredMixin, generic.View):
+    """Изменения заметок пользователя после курсора, в формате JSON."""
+
+    def get(self, request):
+        return JsonResponse(sync_notes(
+            request.user,
+            request.GET.get('cursor', ''),
+            settings.NOTES_SYNC_BATCH_SIZE,
+        ))
+
+
+class NoteExport(NoteBase, generic.View):
+    """Потоковая выгрузка всех заметок пользователя."""
+
+    def get(self, request):
+        try:
+            export, content_type, extension = EXPORT_FORMATS[
+                request.GET.get('format', 'jsonl')
+            ]
+        except KeyError:
+            raise Http404
+        notes = self.get_queryset().only(
+            *TRANSFER_FIELDS, 'updated'
+        ).order_by('id').iterator(
+            chunk_size=settings.NOTES_EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            export(notes), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{extension}"'
+        )
+        return response
+
+
+class NoteImport(NoteBase, generic.FormView):
+    """Загрузка заметок из файла выгрузки."""
+    template_name = 'notes/import.html'
+    form_class = NoteImportForm
+
+    def form_valid(self, form):
+        import_notes(
+            self.request.user,
+            form.cleaned_data['reader'](form.cleaned_data['file']),
+            settings.NOTES_IMPORT_BATCH_SIZE,
+        )
+        return super().form_valid(form)
@@ -0,0 +1,10 @@
+# Слова для синтетических заголовков и текстов заметок в замерах.
+WORDS = (
+    'список', 'покупок', 'идеи', 'для', 'проекта', 'встреча', 'с',
+    'командой', 'планы', 'на', 'неделю', 'рецепт', 'борща', 'книги',
+    'прочитать', 'заметки', 'лекции', 'по', 'истории', 'отпуск', 'в',
+    'горах', 'подарки', 'друзьям', 'ремонт', 'квартиры', 'тренировки',
+    'январь', 'февраль', 'март', 'отчёт', 'задачи', 'важное', 'ёлка',
+    'дача', 'щенок', 'шахматы', 'экзамен', 'юбилей', 'язык', 'жизнь',
+    'цели', 'чтение', 'хобби', 'фильмы', 'учёба', 'сериалы', 'объявление',
+)
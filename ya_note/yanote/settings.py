@@ -1,9 +1,16 @@
+import os
+import sys
 from pathlib import Path
 
 from django.urls import reverse_lazy
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Общий для обоих проектов код (пакет yacommon) лежит в корне репозитория.
+REPOSITORY_DIR = str(BASE_DIR.parent)
+if REPOSITORY_DIR not in sys.path:
+    sys.path.append(REPOSITORY_DIR)
+
 SECRET_KEY = 'django-insecure-yipnj$#j!ajarq%k55z4kuf3x79)91h0h42o9!1ho(z=!%mt=#'
 
 DEBUG = False
@@ -22,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yacommon.metrics.MetricsMiddleware',
+    'yacommon.querylog.QueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -33,12 +42,27 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yanote.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Профили загрузки шаблонов: 'cached' разбирает шаблон один раз
+# на процесс, 'reload' — на каждый рендер, чтобы правки были видны
+# без перезапуска. По умолчанию профиль следует DEBUG.
+TEMPLATE_PROFILES = {
+    'reload': TEMPLATE_LOADERS,
+    'cached': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
+}
+TEMPLATE_PROFILE = os.environ.get(
+    'YANOTE_TEMPLATE_PROFILE', 'reload' if DEBUG else 'cached'
+)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_PROFILES[TEMPLATE_PROFILE],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -54,11 +78,63 @@ WSGI_APPLICATION = 'yanote.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yacommon.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переживает запрос, а с ним и настройки SQLITE_PRAGMAS.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Выполняются на каждом новом соединении, см. yacommon/sqlite3/base.py.
+SQLITE_PRAGMAS = {
+    # Читатели не ждут писателя, а писатель — читателей.
+    'journal_mode': 'WAL',
+    # В режиме WAL это безопасно и избавляет от fsync на каждой записи.
+    'synchronous': 'NORMAL',
+    # Сколько миллисекунд ждать занятую базу вместо «database is locked».
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер кеша страниц в КиБ.
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+# Сколько раз выполнять запись, если база всё же оказалась занята,
+# и базовая задержка между попытками в секундах (растёт вдвое).
+SQLITE_WRITE_ATTEMPTS = 5
+SQLITE_WRITE_RETRY_DELAY = 0.05
+
+# Доля запросов, для которых yacommon.metrics собирает метрики;
+# 0 выключает замеры. Метрики отдаются по адресу /metrics/.
+METRICS_SAMPLE_RATE = 1.0
+# Добавлять ли к ответам заголовок Server-Timing.
+METRICS_SERVER_TIMING = DEBUG
+
+# Журнал медленных запросов yacommon.querylog: порог в миллисекундах,
+# None — выключен. Запросы дольше порога пишутся в лог с планом
+# EXPLAIN QUERY PLAN и местом в коде или шаблоне.
+SLOW_QUERY_THRESHOLD_MS = None
+# Сколько раз за HTTP-запрос один SQL должен выполниться с разными
+# параметрами, чтобы считаться N+1, или с одинаковыми — дублем.
+N_PLUS_ONE_THRESHOLD = 5
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Фрагменты {% cache %}: ключи строятся из (id, updated) и после
+    # правки больше не читаются. В своём кеше они вытесняют друг друга,
+    # а не страницы и другие записи без срока в default.
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template_fragments',
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +163,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_LIST_PAGE = 50
+
+NOTES_SYNC_BATCH_SIZE = 500
+
+NOTES_EXPORT_CHUNK_SIZE = 2000
+
+NOTES_IMPORT_BATCH_SIZE = 1000
+# Наибольший размер одной заметки в zip-архиве после распаковки, в байтах.
+NOTES_IMPORT_MAX_ENTRY_SIZE = 1024 * 1024
@@ -0,0 +1,407 @@
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from abc import ABCMeta, abstractmethod
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http import HTTPStatus
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory, override_settings
+from django.utils.module_loading import import_string
+
+MODES = ('thread', 'process')
+PERCENTILES = (50, 95, 99)
+# Имя хоста запросов, оно должно входить в ALLOWED_HOSTS.
+HOST: str = 'localhost'
+# Метрики, изменение которых показывает сравнение с прошлым замером.
+COMPARED_METRICS = ('p50_ms', 'p99_ms', 'rps', 'peak_rss_mb')
+# Пик памяти процесса (VmHWM) и запись, которая его сбрасывает.
+PROC_STATUS = Path('/proc/self/status')
+PROC_CLEAR_REFS = Path('/proc/self/clear_refs')
+CLEAR_PEAK_RSS: str = '5'
+
+# Запрос к маршруту: данные формы или GET-параметры, cookie
+# и код ответа, который считается успешным.
+RequestSpec = namedtuple(
+    'RequestSpec',
+    ('method', 'path', 'data', 'cookies', 'status'),
+    defaults=(None, None, HTTPStatus.OK),
+)
+
+
+class EnvironFactory(RequestFactory):
+    """RequestFactory, который отдаёт окружение WSGI, а не запрос."""
+
+    def request(self, **request):
+        return self._base_environ(**request)
+
+
+def call(application, spec):
+    """Выполняет запрос через WSGI-приложение и возвращает код ответа."""
+    factory = EnvironFactory(SERVER_NAME=HOST)
+    factory.cookies.load(spec.cookies or {})
+    environ = getattr(factory, spec.method.lower())(spec.path, spec.data)
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split(' ', 1)[0]))
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        # Закрытие ответа отправляет request_finished, как у сервера.
+        response.close()
+    return statuses[0]
+
+
+def reset_peak_rss():
+    """
+    Сбрасывает пик памяти процесса, чтобы peak_rss_mb() считала его
+    заново. Умеет это только Linux; в остальных ОС пик остаётся
+    наибольшим за всё время процесса.
+    """
+    try:
+        PROC_CLEAR_REFS.write_text(CLEAR_PEAK_RSS)
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """Пик памяти процесса с последнего reset_peak_rss(), в МиБ."""
+    try:
+        status = PROC_STATUS.read_text()
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux считает в КиБ, macOS — в байтах.
+        return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    for line in status.splitlines():
+        if line.startswith('VmHWM:'):
+            return int(line.split()[1]) / 1024
+
+
+def run_requests(application_path, specs, warmup):
+    """
+    Выполняет запросы по очереди, первые warmup без замера.
+
+    Возвращает задержки, число неожиданных ответов, начало и конец
+    замеренной части по часам time.time(), общим для всех процессов,
+    и пик памяти процесса.
+    """
+    application = import_string(application_path)
+    latencies, errors = [], 0
+    measured_from = time.time()
+    for index, spec in enumerate(specs):
+        if index == warmup:
+            measured_from = time.time()
+        started = time.perf_counter()
+        status = call(application, spec)
+        latency = time.perf_counter() - started
+        errors += status != spec.status
+        if index >= warmup:
+            latencies.append(latency)
+    return latencies, errors, (measured_from, time.time()), peak_rss_mb()
+
+
+def run_requests_in_thread(application_path, specs, warmup):
+    try:
+        return run_requests(application_path, specs, warmup)
+    finally:
+        # У каждого потока своё соединение с базой.
+        connections.close_all()
+
+
+def run_route(application_path, specs, mode, concurrency, warmup):
+    """
+    Раздаёт запросы поровну concurrency потокам или процессам.
+
+    Пропускная способность считается от начала замера первого
+    исполнителя до конца последнего, без запуска процессов и прогрева.
+    Пик памяти относится только к этому маршруту: потоки работают
+    в процессе со сброшенным пиком, процессы запускаются заново.
+    """
+    chunks = [specs[index::concurrency] for index in range(concurrency)]
+    if mode == 'thread':
+        reset_peak_rss()
+        executor = ThreadPoolExecutor(concurrency)
+        worker = run_requests_in_thread
+    else:
+        # Дочерние процессы наследуют настроенный Django, но не
+        # открытые соединения.
+        connections.close_all()
+        executor = ProcessPoolExecutor(
+            concurrency, mp_context=multiprocessing.get_context('fork')
+        )
+        worker = run_requests
+    with executor:
+        results = list(executor.map(
+            worker,
+            [application_path] * concurrency,
+            chunks,
+            [warmup] * concurrency,
+        ))
+    latencies = sorted(
+        latency for chunk_latencies, *_ in results
+        for latency in chunk_latencies
+    )
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors, _, _ in results),
+        **{
+            f'p{percentile}_ms': cuts[percentile - 1] * 1000
+            for percentile in PERCENTILES
+        },
+        'rps': len(latencies) / (
+            max(end for _, _, (_, end), _ in results)
+            - min(start for _, _, (start, _), _ in results)
+        ),
+        'peak_rss_mb': max(rss for *_, rss in results),
+    }
+
+
+def login_cookies(user):
+    """Cookie сессии пользователя и CSRF, а также токен для форм."""
+    client = Client()
+    client.force_login(user)
+    request = RequestFactory().get('/')
+    token = get_token(request)
+    return {
+        settings.SESSION_COOKIE_NAME: (
+            client.cookies[settings.SESSION_COOKIE_NAME].value
+        ),
+        settings.CSRF_COOKIE_NAME: request.META['CSRF_COOKIE'],
+    }, token
+
+
+def production_settings():
+    """
+    Настройки продакшена на время замера: без журнала запросов к базе,
+    отладочных страниц и с кешированным загрузчиком шаблонов. Загрузчик
+    задаётся явно: TEMPLATE_PROFILE выбран по DEBUG ещё при импорте
+    настроек.
+    """
+    return override_settings(DEBUG=False, TEMPLATES=[
+        {
+            **engine,
+            'OPTIONS': {
+                **engine.get('OPTIONS', {}),
+                'loaders': settings.TEMPLATE_PROFILES['cached'],
+            },
+        }
+        for engine in settings.TEMPLATES
+    ])
+
+
+@contextmanager
+def temporary_database():
+    """Переключает базу default на новый временный файл с миграциями."""
+    original = connection.settings_dict['NAME']
+    with tempfile.TemporaryDirectory() as directory:
+        connections.close_all()
+        connection.settings_dict['NAME'] = str(
+            Path(directory) / 'bench.sqlite3'
+        )
+        try:
+            call_command('migrate', verbosity=0, interactive=False)
+            yield
+        finally:
+            connections.close_all()
+            connection.settings_dict['NAME'] = original
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True,
+            check=True,
+            cwd=settings.BASE_DIR,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results):
+    """
+    Изменение метрик относительно прошлого замера, в процентах.
+
+    Возвращает пары (результат, изменения) для маршрутов, которые
+    есть в обоих замерах.
+    """
+    previous = {
+        (result['scale'], result['mode'], result['route']): result
+        for result in baseline['results']
+    }
+    for result in results:
+        before = previous.get(
+            (result['scale'], result['mode'], result['route'])
+        )
+        if before is None:
+            continue
+        yield result, {
+            metric: (result[metric] / before[metric] - 1) * 100
+            for metric in COMPARED_METRICS if before[metric]
+        }
+
+
+class BenchmarkCommand(BaseCommand, metaclass=ABCMeta):
+    """
+    Замер задержек, пропускной способности и памяти по маршрутам.
+
+    Для каждого масштаба данных создаётся временная база, которую
+    наполняет prepare(). Маршруты из routes задаются методами
+    route_<имя>(count), возвращающими count запросов RequestSpec.
+    """
+    application = None
+    scales = {}
+    routes = ()
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            dest='scales',
+            nargs='+',
+            choices=tuple(self.scales),
+            default=[next(iter(self.scales))],
+        )
+        parser.add_argument(
+            '--mode', dest='modes', nargs='+', choices=MODES, default=MODES
+        )
+        parser.add_argument(
+            '--route',
+            dest='routes',
+            nargs='+',
+            choices=self.routes,
+            default=self.routes,
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Сколько запросов замерять на маршрут и режим.'
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Сколько первых запросов каждого исполнителя не замерять.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого замера для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['warmup'] < 0:
+            raise CommandError(
+                '--concurrency должен быть положительным, '
+                '--warmup — неотрицательным.'
+            )
+        if options['requests'] < 2 * options['concurrency']:
+            raise CommandError(
+                '--requests должен быть не меньше двух на исполнителя.'
+            )
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(
+                    Path(options['compare']).read_text(encoding='utf-8')
+                )
+            except (OSError, ValueError) as error:
+                raise CommandError(error)
+        results = []
+        with production_settings():
+            for scale in options['scales']:
+                with temporary_database():
+                    self.rng = random.Random(options['seed'])
+                    self.prepare(scale, options['seed'])
+                    results.extend(self.run_scale(scale, options))
+        if options['output']:
+            self.save(options['output'], results, options)
+        if baseline is not None:
+            self.write_comparison(baseline, results)
+
+    @abstractmethod
+    def prepare(self, scale, seed):
+        """Наполняет временную базу данными масштаба scale."""
+
+    def run_scale(self, scale, options):
+        count = options['requests'] + (
+            options['warmup'] * options['concurrency']
+        )
+        for route in options['routes']:
+            for mode in options['modes']:
+                result = {
+                    'scale': scale,
+                    'mode': mode,
+                    'route': route,
+                    **run_route(
+                        self.application,
+                        getattr(self, f'route_{route}')(count),
+                        mode,
+                        options['concurrency'],
+                        options['warmup'],
+                    ),
+                }
+                self.stdout.write(
+                    f'{scale:>6} {mode:>7} {route:<8} '
+                    f'p50 {result["p50_ms"]:7.2f} ms, '
+                    f'p95 {result["p95_ms"]:7.2f} ms, '
+                    f'p99 {result["p99_ms"]:7.2f} ms, '
+                    f'{result["rps"]:7.0f} req/s, '
+                    f'RSS {result["peak_rss_mb"]:.0f} MiB, '
+                    f'ошибок {result["errors"]}'
+                )
+                yield result
+
+    def save(self, path, results, options):
+        report = {
+            'application': self.application,
+            'revision': git_revision(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'options': {
+                name: options[name]
+                for name in ('requests', 'concurrency', 'warmup', 'seed')
+            },
+            'results': results,
+        }
+        Path(path).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2),
+            encoding='utf-8',
+        )
+
+    def write_comparison(self, baseline, results):
+        self.stdout.write(
+            f'Сравнение с {baseline.get("revision") or "прошлым замером"}:'
+        )
+        for result, changes in compare(baseline, results):
+            self.stdout.write(
+                f'{result["scale"]:>6} {result["mode"]:>7} '
+                f'{result["route"]:<8} ' + ', '.join(
+                    f'{metric} {change:+.1f}%'
+                    for metric, change in changes.items()
+                )
+            )
@@ -0,0 +1,38 @@
+import time
+from itertools import accumulate
+
+# Показатель распределения Ципфа для синтетических данных: несколько
+# элементов выпадают намного чаще остальных.
+ZIPF_EXPONENT: float = 1.1
+
+
+def zipf_cum_weights(count, exponent=ZIPF_EXPONENT):
+    """Накопленные веса, с которыми k-й элемент выпадает в k**s раз реже."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class Progress:
+    """
+    Отчёт о скорости долгой загрузки для команд управления.
+
+    report() пишет в stream не чаще раза в every секунд,
+    сколько строк готово и сколько строк в секунду.
+    """
+
+    def __init__(self, stream, every):
+        self.stream = stream
+        self.every = every
+        self.started = self.reported = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def report(self, done):
+        now = time.monotonic()
+        if now - self.reported < self.every:
+            return
+        self.reported = now
+        rate = done / (now - self.started)
+        self.stream.write(f'{done} строк, {rate:.0f} строк/с')
@@ -0,0 +1,12 @@
+from django.core.cache import InvalidCacheBackendError, caches
+
+# Кеш, в который тег {% cache %} пишет без параметра using.
+FRAGMENT_CACHE_ALIAS: str = 'template_fragments'
+
+
+def get_fragment_cache():
+    """Кеш фрагментов; без своего псевдонима тег пишет в default."""
+    try:
+        return caches[FRAGMENT_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches['default']
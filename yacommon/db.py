@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from .metrics import registry
+
+# Сообщения SQLite о занятой базе: общей блокировки файла
+# и табличной блокировки в режиме общего кеша.
+LOCKED_ERRORS = ('database is locked', 'database table is locked')
+
+# Записи одного процесса выстраиваются в очередь здесь, а не в SQLite:
+# так потоки не тратят busy_timeout на ожидание друг друга.
+write_lock = threading.Lock()
+
+
+class WriteStats:
+    """Ожидание блокировки записи и повторы записей в этом процессе."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.retries = 0
+        self.failures = 0
+
+    def waited(self, seconds):
+        with self._lock:
+            self.writes += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def retried(self):
+        with self._lock:
+            self.retries += 1
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+
+    def collect(self):
+        """Счётчики для yacommon.metrics."""
+        with self._lock:
+            return (
+                ('db_writes_total', 'counter',
+                 'Записи под блокировкой процесса.', self.writes),
+                ('db_write_lock_wait_seconds_total', 'counter',
+                 'Ожидание блокировки записи.', self.wait_seconds),
+                ('db_write_lock_max_wait_seconds', 'gauge',
+                 'Самое долгое ожидание блокировки записи.',
+                 self.max_wait_seconds),
+                ('db_write_retries_total', 'counter',
+                 'Повторы записи при занятой базе.', self.retries),
+                ('db_write_failures_total', 'counter',
+                 'Записи, не выполненные после всех попыток.',
+                 self.failures),
+            )
+
+
+stats = WriteStats()
+registry.add_collector(stats.collect)
+
+
+def is_locked(error):
+    return any(message in str(error) for message in LOCKED_ERRORS)
+
+
+def serialized_write(function):
+    """
+    Выполняет запись в своей транзакции под блокировкой процесса.
+
+    Если база всё-таки занята другим процессом, запись повторяется
+    до SQLITE_WRITE_ATTEMPTS раз со случайной растущей задержкой.
+    Внутри уже открытой транзакции повтор невозможен, и функция
+    выполняется как есть.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if connection.in_atomic_block:
+            return function(*args, **kwargs)
+        attempts = settings.SQLITE_WRITE_ATTEMPTS
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            with write_lock:
+                stats.waited(time.perf_counter() - started)
+                try:
+                    with transaction.atomic():
+                        return function(*args, **kwargs)
+                except OperationalError as error:
+                    if not is_locked(error) or attempt == attempts:
+                        stats.failed()
+                        raise
+            stats.retried()
+            time.sleep(random.uniform(
+                0, settings.SQLITE_WRITE_RETRY_DELAY * 2 ** (attempt - 1)
+            ))
+    return wrapper
@@ -0,0 +1,215 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+UNRESOLVED_VIEW: str = '<unresolved>'
+PROMETHEUS_CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+# Имя метрики: описание и границы корзин гистограммы.
+METRICS = {
+    'http_request_duration_seconds': (
+        'Время обработки запроса.', SECONDS_BUCKETS
+    ),
+    'http_request_db_queries': (
+        'Число запросов к БД за запрос.', (0, 1, 2, 3, 5, 10, 20, 50, 100)
+    ),
+    'http_request_db_duration_seconds': (
+        'Время запросов к БД за запрос.', SECONDS_BUCKETS
+    ),
+    'http_request_template_render_seconds': (
+        'Время рендеринга шаблона.', SECONDS_BUCKETS
+    ),
+    'http_response_size_bytes': (
+        'Размер ответа.', tuple(2 ** power for power in range(8, 23, 2))
+    ),
+}
+
+
+class Histogram:
+    """Гистограмма с накопительными корзинами, как в Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """
+    Гистограммы метрик по именам представлений в этом процессе.
+
+    Счётчики, которые ведут сами подсистемы (кеш страниц, блокировка
+    записи), подключаются через add_collector() и выводятся рядом.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.collectors = []
+
+    def add_collector(self, collect):
+        """
+        Подключает функцию, которая отдаёт кортежи
+        (имя, тип, описание, значение) для render().
+        """
+        self.collectors.append(collect)
+
+    def observe(self, name, view, value):
+        with self._lock:
+            histogram = self.histograms.get((name, view))
+            if histogram is None:
+                histogram = self.histograms[(name, view)] = Histogram(
+                    METRICS[name][1]
+                )
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def render(self):
+        """Текстовый формат Prometheus."""
+        lines = []
+        with self._lock:
+            for name, (description, _) in METRICS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, view), histogram in sorted(
+                    self.histograms.items()
+                ):
+                    if metric != name:
+                        continue
+                    label = f'view="{escape_label(view)}"'
+                    for bound, count in histogram.cumulative():
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} {count}'
+                        )
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{{label}}} {sum(histogram.counts)}'
+                    )
+        for collect in self.collectors:
+            for name, kind, description, value in collect():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def escape_label(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n'
+    )
+
+
+class RequestSample:
+    """Замеры одного запроса: время SQL и рендеринга шаблона."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_started = None
+        self.render_seconds = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    def rendered(self, response):
+        self.render_seconds = time.perf_counter() - self.render_started
+
+
+class MetricsMiddleware:
+    """
+    Собирает метрики запросов по имени представления (news:detail…).
+
+    В выборку попадает доля METRICS_SAMPLE_RATE запросов; остальные,
+    как и все при нулевой доле, проходят без замеров. С включённым
+    METRICS_SERVER_TIMING замеры попадают и в заголовок Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+        sample = request._metrics_sample = RequestSample()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sample))
+            response = self.get_response(request)
+        self.record(request, response, sample)
+        return response
+
+    def process_template_response(self, request, response):
+        sample = getattr(request, '_metrics_sample', None)
+        if sample is not None:
+            sample.render_started = time.perf_counter()
+            response.add_post_render_callback(sample.rendered)
+        return response
+
+    @staticmethod
+    def record(request, response, sample):
+        duration = time.perf_counter() - sample.started
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED_VIEW
+        registry.observe('http_request_duration_seconds', view, duration)
+        registry.observe('http_request_db_queries', view, sample.queries)
+        registry.observe(
+            'http_request_db_duration_seconds', view, sample.db_seconds
+        )
+        if sample.render_seconds is not None:
+            registry.observe(
+                'http_request_template_render_seconds',
+                view,
+                sample.render_seconds,
+            )
+        if not response.streaming:
+            registry.observe(
+                'http_response_size_bytes', view, len(response.content)
+            )
+        if settings.METRICS_SERVER_TIMING:
+            timings = [
+                f'app;dur={duration * 1000:.1f}',
+                f'db;dur={sample.db_seconds * 1000:.1f};'
+                f'desc="{sample.queries} queries"',
+            ]
+            if sample.render_seconds is not None:
+                timings.append(f'tpl;dur={sample.render_seconds * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(timings)
+
+
+def metrics_view(request):
+    """Метрики процесса для Prometheus."""
+    return HttpResponse(
+        registry.render(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
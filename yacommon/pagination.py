@@ -0,0 +1,122 @@
+import base64
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+CURSOR_SEPARATOR: str = '|'
+INVALID_CURSOR: str = 'Некорректный курсор страницы.'
+
+
+class KeysetPage:
+    """Страница, полученная keyset-пагинацией."""
+
+    def __init__(self, object_list, cursor=None, next_cursor=None):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor is not None
+
+
+def pack_cursor(values):
+    raw = CURSOR_SEPARATOR.join(map(str, values))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(obj, fields):
+    """Упаковывает значения полей объекта в непрозрачный курсор."""
+    return pack_cursor(getattr(obj, field) for field in fields)
+
+
+def encode_cursor_at(obj, fields, descending=True):
+    """
+    Курсор страницы, которая начинается с самого obj.
+
+    Последнее поле сдвигается на единицу против хода страницы,
+    поэтому оно, как id, должно быть целым.
+    """
+    *leading, last = fields
+    return pack_cursor([
+        *(getattr(obj, field) for field in leading),
+        getattr(obj, last) + (1 if descending else -1),
+    ])
+
+
+def decode_cursor(cursor, model, fields):
+    """Распаковывает курсор в значения полей, приведённые к типам модели."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)
+        ).decode()
+        values = raw.split(CURSOR_SEPARATOR)
+        if len(values) != len(fields):
+            raise ValueError(cursor)
+        return [
+            model._meta.get_field(field).to_python(value)
+            for field, value in zip(fields, values)
+        ]
+    except (ValueError, ValidationError):
+        raise Http404(INVALID_CURSOR)
+
+
+def paginate_keyset(queryset, fields, cursor, per_page, descending=True):
+    """
+    Возвращает страницу queryset, начинающуюся сразу после курсора.
+
+    Последнее поле в fields должно быть уникальным. Условие на первое
+    поле позволяет SQLite начать чтение индекса прямо с позиции курсора,
+    поэтому любая страница стоит столько же, сколько первая.
+    """
+    ordering = [f'-{field}' if descending else field for field in fields]
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, fields)
+        lookup = 'lt' if descending else 'gt'
+        after_cursor = Q()
+        for index, field in enumerate(fields):
+            after_cursor |= Q(
+                **dict(zip(fields[:index], values[:index])),
+                **{f'{field}__{lookup}': values[index]},
+            )
+        queryset = queryset.filter(
+            after_cursor, **{f'{fields[0]}__{lookup}e': values[0]}
+        )
+    object_list = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(object_list) > per_page:
+        object_list = object_list[:per_page]
+        next_cursor = encode_cursor(object_list[-1], fields)
+    return KeysetPage(object_list, cursor or None, next_cursor)
+
+
+class KeysetPaginationMixin:
+    """Подменяет в ListView постраничную навигацию на keyset-пагинацию."""
+
+    keyset_fields = ('id',)
+    keyset_descending = True
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate_keyset(
+            queryset,
+            self.keyset_fields,
+            self.request.GET.get(self.cursor_kwarg),
+            page_size,
+            self.keyset_descending,
+        )
+        return None, page, page.object_list, (
+            page.has_next or page.has_previous
+        )
@@ -0,0 +1,164 @@
+import logging
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_ORIGIN: str = '?'
+# Кадры общего кода (middleware, бэкенд БД, пагинация) пропускаются.
+COMMON_DIR = str(Path(__file__).resolve().parent)
+
+
+def find_origin():
+    """
+    Место в коде приложений, откуда пришёл запрос к БД.
+
+    Ищется первый кадр из кода проекта, кроме yacommon. Если
+    запрос выполнен при рендеринге шаблона, к месту добавляются шаблон
+    и строка тега, на котором он выполнен.
+    """
+    base_dir = str(settings.BASE_DIR)
+    code = template = None
+    frame = sys._getframe(1)
+    while frame is not None and (code is None or template is None):
+        filename = frame.f_code.co_filename
+        node = frame.f_locals.get('self')
+        # type(), а не isinstance(): тот вычислил бы ленивые объекты
+        # вроде request.user и выполнил бы новый запрос.
+        if template is None and issubclass(type(node), Node) and getattr(
+            node, 'token', None
+        ):
+            template = f'{node.origin.template_name}:{node.token.lineno}'
+        if code is None and filename.startswith(base_dir) and not (
+            filename.startswith(COMMON_DIR) or 'site-packages' in filename
+        ):
+            code = (
+                f'{Path(filename).relative_to(base_dir)}:{frame.f_lineno} '
+                f'in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    origin = [code] if code else []
+    if template:
+        origin.append(f'template {template}')
+    return ', '.join(origin) or UNKNOWN_ORIGIN
+
+
+def explain(connection, sql, params):
+    """План запроса SQLite в виде дерева, или None, если его не получить."""
+    if connection.vendor != 'sqlite' or not sql.lstrip().upper().startswith(
+        'SELECT'
+    ):
+        return None
+    # Собственный курсор соединения не попадает в execute_wrapper.
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    finally:
+        cursor.close()
+    depths = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+    return '\n'.join(lines)
+
+
+class RequestQueryLog:
+    """
+    Журнал запросов к БД за один HTTP-запрос.
+
+    Медленные запросы пишутся в лог сразу. Запросы группируются
+    по тексту SQL: повторы с разными параметрами в конце сообщаются
+    как N+1, повторы с одними и теми же — как дубли.
+    """
+
+    def __init__(self, request, threshold_ms):
+        self.request = request
+        self.threshold = threshold_ms / 1000
+        self.groups = defaultdict(lambda: {
+            'count': 0, 'seconds': 0.0, 'params': Counter(),
+        })
+
+    @property
+    def view_name(self):
+        match = self.request.resolver_match
+        return match.view_name if match else self.request.path
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            group = self.groups[sql]
+            group['count'] += 1
+            group['seconds'] += duration
+            # repr(): параметры бывают списками, а их нельзя хешировать.
+            group['params'][repr(params)] += 1
+            if group['count'] == 1:
+                group['origin'] = find_origin()
+            if duration >= self.threshold:
+                self.log_slow(
+                    context['connection'], sql, params, many, duration,
+                    group['origin'] if group['count'] == 1 else find_origin()
+                )
+
+    def log_slow(self, connection, sql, params, many, duration, origin):
+        plan = None if many else explain(connection, sql, params)
+        logger.warning(
+            'Slow query %.1f ms in %s at %s\nSQL: %s\nParams: %r\nPlan:\n%s',
+            duration * 1000, self.view_name, origin, sql, params,
+            plan or '  (нет)',
+        )
+
+    def report(self):
+        """
+        Сообщает о SQL, выполненном не меньше N_PLUS_ONE_THRESHOLD раз
+        с разными параметрами (N+1) или с одними и теми же (дубли).
+        """
+        threshold = settings.N_PLUS_ONE_THRESHOLD
+        for sql, group in self.groups.items():
+            distinct = len(group['params'])
+            if distinct >= threshold:
+                logger.warning(
+                    'N+1 in %s: %d × %s with different parameters, '
+                    '%.1f ms in total, first at %s',
+                    self.view_name, distinct, sql,
+                    group['seconds'] * 1000, group['origin'],
+                )
+            repeats = max(group['params'].values())
+            if repeats >= threshold:
+                logger.warning(
+                    'Duplicate query in %s: %d × %s with the same '
+                    'parameters, first at %s',
+                    self.view_name, repeats, sql, group['origin'],
+                )
+
+
+class QueryLogMiddleware:
+    """Включает RequestQueryLog, если задан SLOW_QUERY_THRESHOLD_MS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if threshold is None:
+            return self.get_response(request)
+        log = RequestQueryLog(request, threshold)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            response = self.get_response(request)
+        log.report()
+        return response
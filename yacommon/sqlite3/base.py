@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполняет PRAGMA из словаря «имя: значение» на соединении sqlite3."""
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite с настройками из SQLITE_PRAGMAS для каждого нового соединения.
+
+    Часть PRAGMA (journal_mode) хранится в самом файле базы,
+    остальные действуют только в пределах соединения, поэтому
+    соединения стоит держать открытыми через CONN_MAX_AGE.
+
+    OPTIONS['transaction_mode'] задаёт вид BEGIN для transaction.atomic:
+    с IMMEDIATE транзакция сразу берёт блокировку записи и ждёт её
+    по busy_timeout, а не падает с «database is locked», когда чтение
+    внутри транзакции сменяется записью.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection, settings.SQLITE_PRAGMAS)
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,36 @@
+from django.db import connection
+
+from .querylog import explain
+
+# Scans that do not read a whole table: a covering index holds every
+# column the query needs, and a virtual table is an FTS index. A plain
+# "SCAN t USING INDEX" still walks every row of t and is a full scan.
+ACCEPTED_SCANS = (' USING COVERING INDEX ', ' VIRTUAL TABLE ')
+
+
+def capture_queries(client, url, data=None):
+    """
+    Runs a GET request and returns the response together with the SQL
+    and parameters it executed, streamed content included.
+    """
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        response = client.get(url, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return response, queries
+
+
+def full_scans(sql, params, accepted=ACCEPTED_SCANS):
+    """Table scans in the query plan other than the accepted ones."""
+    plan = explain(connection, sql, params) or ''
+    return [
+        line.strip() for line in plan.splitlines()
+        if line.strip().startswith('SCAN ')
+        and not any(scan in f'{line.strip()} ' for scan in accepted)
+    ]